@@ -1,10 +1,13 @@
 from quart import Quart
 
+from chgk.compression import compress_html_response
 from chgk.preprocessors import on_startup, on_shutdown
 from chgk.urls import game_blueprint
 
 app = Quart(__name__, static_folder=None)
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 1
 app.register_blueprint(game_blueprint)
 
 app.before_serving(on_startup)
 app.after_serving(on_shutdown)
+app.after_request(compress_html_response)
@@ -0,0 +1,209 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+if __package__ in (None, ''):
+    # Started as a script, app_settings and the chgk package live in the repository root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def configure_offline_database():
+    os.environ.setdefault('DB_BACKEND', 'sqlite')
+    os.environ.setdefault('CHGK_SITE_DB_NAME', ':memory:')
+
+
+class ASGIDriver:
+    def __init__(self, app):
+        self.app = app
+        self._lifespan = None
+        self._lifespan_messages = None
+
+    async def startup(self):
+        self._lifespan_messages = asyncio.Queue()
+        started = asyncio.get_running_loop().create_future()
+
+        async def receive():
+            return await self._lifespan_messages.get()
+
+        async def send(message):
+            if message['type'] == 'lifespan.startup.complete':
+                started.set_result(None)
+            elif message['type'] == 'lifespan.startup.failed':
+                started.set_exception(RuntimeError(message.get('message', 'Startup failed')))
+
+        scope = {'type': 'lifespan', 'asgi': {'version': '3.0'}}
+        self._lifespan = asyncio.ensure_future(self.app(scope, receive, send))
+        await self._lifespan_messages.put({'type': 'lifespan.startup'})
+        await started
+
+    async def shutdown(self):
+        await self._lifespan_messages.put({'type': 'lifespan.shutdown'})
+        await self._lifespan
+
+    async def request(self, path: str, headers: list = ()):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [(b'host', b'localhost')] + [(name.encode(), value.encode()) for name, value in headers],
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+            'extensions': {},
+        }
+        request_sent = False
+        status = None
+        body_size = 0
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Future()
+
+        async def send(message):
+            nonlocal status, body_size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                body_size += len(message.get('body', b''))
+
+        await self.app(scope, receive, send)
+        return status, body_size
+
+
+def blueprint_paths(app, blueprint_name: str):
+    paths = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint.startswith(f'{blueprint_name}.') and not rule.arguments and 'GET' in rule.methods:
+            paths.append(rule.rule)
+    blueprint = app.blueprints[blueprint_name]
+    if blueprint.has_static_folder:
+        static_folder = Path(blueprint.static_folder)
+        for file in sorted(static_folder.rglob('*')):
+            if file.is_file() and not file.name.endswith(('.gz', '.br')):
+                paths.append(f'{blueprint.static_url_path}/{file.relative_to(static_folder).as_posix()}')
+    return paths
+
+
+def percentile(sorted_values: list, fraction: float):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def load(driver, path: str, requests_count: int, concurrency: int, headers: list):
+    latencies = []
+    statuses = {}
+    remaining = iter(range(requests_count))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            status, _ = await driver.request(path, headers)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests_per_second': requests_count / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'statuses': statuses,
+    }
+
+
+async def allocations(driver, path: str, requests_count: int, headers: list):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    peaks = []
+    for _ in range(requests_count):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await driver.request(path, headers)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    differences = after.compare_to(before, 'filename')
+    return {
+        'peak_bytes_per_request': sum(peaks) / requests_count,
+        'retained_bytes_per_request': sum(stat.size_diff for stat in differences) / requests_count,
+        'retained_blocks_per_request': sum(stat.count_diff for stat in differences) / requests_count,
+    }
+
+
+async def run(args):
+    configure_offline_database()
+    from app_settings import app
+
+    driver = ASGIDriver(app)
+    await driver.startup()
+    headers = [tuple(header.split(':', 1)) for header in args.header]
+    results = {}
+    try:
+        paths = args.path or blueprint_paths(app, args.blueprint)
+        for path in paths:
+            for _ in range(args.warmup):
+                await driver.request(path, headers)
+            results[path] = {
+                'concurrency': {concurrency: await load(driver, path, args.requests, concurrency, headers)
+                                for concurrency in args.concurrency},
+                'memory': await allocations(driver, path, args.memory_requests, headers),
+            }
+    finally:
+        await driver.shutdown()
+    return results
+
+
+def print_results(results: dict):
+    for path, result in results.items():
+        print(path)
+        for concurrency, stats in result['concurrency'].items():
+            print(f'  concurrency {concurrency}: {stats["requests_per_second"]:.0f} req/s, '
+                  f'p50 {stats["p50_ms"]:.2f}ms, '
+                  f'p95 {stats["p95_ms"]:.2f}ms, p99 {stats["p99_ms"]:.2f}ms, statuses {stats["statuses"]}')
+        memory = result['memory']
+        print(f'  memory: peak {memory["peak_bytes_per_request"] / 1024:.1f}KiB per request, '
+              f'retained {memory["retained_bytes_per_request"]:.0f} bytes '
+              f'({memory["retained_blocks_per_request"]:.1f} blocks) per request')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='In-process ASGI load test of app_settings.app')
+    parser.add_argument('--blueprint', default='chgk')
+    parser.add_argument('--path', nargs='+', help='paths to request instead of the blueprint routes and static files')
+    parser.add_argument('--header', nargs='+', default=[], help='extra request headers as "name:value"')
+    parser.add_argument('--requests', type=int, default=2_000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--memory-requests', type=int, default=200)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+    if any(status >= 400 for result in results.values() for stats in result['concurrency'].values()
+           for status in stats['statuses']):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
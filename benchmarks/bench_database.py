@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+if __package__ in (None, ''):
+    # Started as a script, the chgk package lives in the repository root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chgk.database import CommonDatabase
+from chgk.database_rows import row_class
+
+
+TABLE = 'bench_players'
+COLUMNS = ['name', 'score']
+
+
+async def create_database(rows_count: int, **options):
+    database = CommonDatabase(':memory:', user=None, password=None, backend='sqlite', **options)
+    await database.ensure_connection_pool()
+    conn = await database._acquire()
+    async with conn.cursor() as cur:
+        await cur.execute(f'CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, name TEXT UNIQUE, score INTEGER)')
+        await cur.execute(f'INSERT INTO {TABLE} (name, score) '
+                          f'WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {rows_count}) '
+                          f"SELECT 'player' || i, i FROM n")
+    await conn.commit()
+    database.release_connection(conn)
+    await database.refresh_schema()
+    return database
+
+
+def raw_baseline(rows_count: int, calls: int):
+    conn = sqlite3.connect(':memory:')
+    conn.execute(f'CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, name TEXT UNIQUE, score INTEGER)')
+    conn.executemany(f'INSERT INTO {TABLE} (name, score) VALUES (?, ?)',
+                     ((f'player{i}', i) for i in range(1, rows_count + 1)))
+    started = time.perf_counter()
+    for i in range(calls):
+        conn.execute(f'SELECT score FROM {TABLE} WHERE name = ? LIMIT 2', (f'player{i % rows_count + 1}',)).fetchall()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed / calls
+
+
+def operations(database, rows_count: int):
+    counter = iter(range(10 ** 9))
+
+    async def filter_rows():
+        await database.filter(TABLE, COLUMNS, {'score': 1}, cache=False)
+
+    async def get_row():
+        await database.get(TABLE, ['score'], {'name': f'player{next(counter) % rows_count + 1}'})
+
+    async def create_row():
+        await database.create(TABLE, COLUMNS, [f'new{next(counter)}', 0])
+
+    async def update_or_create_row():
+        name = f'player{next(counter) % rows_count + 1}'
+        await database.update_or_create(TABLE, COLUMNS, [name, 1], condition={'name': name})
+
+    async def update_or_create_many_rows():
+        i = next(counter)
+        await database.update_or_create_many(TABLE, COLUMNS, [[f'upsert{i}', i], [f'player{i % rows_count + 1}', i]],
+                                             update_columns=['score'])
+
+    return {
+        'filter': filter_rows,
+        'get': get_row,
+        'create': create_row,
+        'update_or_create': update_or_create_row,
+        'update_or_create_many': update_or_create_many_rows,
+    }
+
+
+async def per_call_overhead(operation, calls: int):
+    started = time.perf_counter()
+    for _ in range(calls):
+        await operation()
+    return (time.perf_counter() - started) / calls
+
+
+async def throughput(operation, calls: int, concurrency: int):
+    remaining = iter(range(calls))
+
+    async def worker():
+        for _ in remaining:
+            await operation()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return calls / (time.perf_counter() - started)
+
+
+async def memory_per_rows(rows_count: int):
+    database = await create_database(rows_count)
+    # Inputs are built before tracing starts, so only the memory of the database layer is measured
+    names = [f'player{i}' for i in range(1, rows_count + 1)]
+    new_rows = [[f'new{i}', i] for i in range(rows_count)]
+    upsert_rows = [[name, 0] for name in names]
+    results = {}
+    for name, operation in (
+            ('filter', lambda: database.filter(TABLE, COLUMNS, cache=False)),
+            ('filter_row_factory', lambda: database.filter(TABLE, COLUMNS, cache=False, row_factory=row_class)),
+            ('get_many', lambda: database.get_many(TABLE, names, COLUMNS, key_column='name', cache=False)),
+            ('create_many', lambda: database.create_many(TABLE, COLUMNS, new_rows)),
+            ('update_or_create_many', lambda: database.update_or_create_many(TABLE, COLUMNS, upsert_rows,
+                                                                             update_columns=['score']))):
+        tracemalloc.start()
+        result = await operation()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {'retained_bytes': current, 'peak_bytes': peak, 'rows': rows_count}
+        del result
+    await database.close_all_connections()
+    return results
+
+
+async def run(args):
+    results = {'raw_sqlite_get_seconds': raw_baseline(args.rows, args.calls), 'operations': {}}
+    for name in operations(None, args.rows):
+        if args.only and name not in args.only:
+            continue
+        database = await create_database(args.rows)
+        operation = operations(database, args.rows)[name]
+        overhead = await per_call_overhead(operation, args.calls)
+        results['operations'][name] = {
+            'seconds_per_call': overhead,
+            'throughput': {concurrency: await throughput(operation, args.calls, concurrency)
+                           for concurrency in args.concurrency},
+        }
+        await database.close_all_connections()
+    results['memory'] = await memory_per_rows(args.memory_rows)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    regressions = []
+    for name, result in results['operations'].items():
+        expected = baseline.get('operations', {}).get(name)
+        if expected is None:
+            continue
+        if result['seconds_per_call'] > expected['seconds_per_call'] * (1 + tolerance):
+            regressions.append(f'{name}: {result["seconds_per_call"] * 1e6:.1f}us per call, '
+                               f'baseline {expected["seconds_per_call"] * 1e6:.1f}us')
+    for name, result in results['memory'].items():
+        expected = baseline.get('memory', {}).get(name)
+        if expected is not None and result['retained_bytes'] > expected['retained_bytes'] * (1 + tolerance):
+            regressions.append(f'{name}: {result["retained_bytes"]} bytes retained, '
+                               f'baseline {expected["retained_bytes"]}')
+    return regressions
+
+
+def print_results(results: dict):
+    print(f'raw sqlite3 get: {results["raw_sqlite_get_seconds"] * 1e6:.1f}us per call')
+    for name, result in results['operations'].items():
+        throughput_info = ', '.join(f'{concurrency}: {value:.0f}/s'
+                                    for concurrency, value in result['throughput'].items())
+        print(f'{name}: {result["seconds_per_call"] * 1e6:.1f}us per call; throughput {throughput_info}')
+    for name, result in results['memory'].items():
+        print(f'{name}: {result["retained_bytes"] / result["rows"] * 100_000 / 2 ** 20:.2f}MiB per 100k rows '
+              f'(peak {result["peak_bytes"] / 2 ** 20:.2f}MiB)')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Database layer benchmarks on the in-memory SQLite backend')
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--calls', type=int, default=2_000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--memory-rows', type=int, default=100_000)
+    parser.add_argument('--only', nargs='+')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', help='fail if results regress against this results file')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import gzip
+import os
+from collections import OrderedDict
+
+from quart import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+STATIC_VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSED_SUFFIXES = tuple(suffix for _, suffix in STATIC_VARIANTS)
+COMPRESSIBLE_SUFFIXES = ('.css', '.js', '.mjs', '.html', '.htm', '.svg', '.json', '.map', '.txt', '.xml', '.ico',
+                         '.ttf', '.otf', '.eot')
+GZIP_ETAG_SUFFIX = '-gzip'
+
+
+def static_encodings():
+    encodings = [('gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encodings.insert(0, ('br', '.br', lambda data: brotli.compress(data, quality=11)))
+    return encodings
+
+
+def precompress_file(path: str):
+    with open(path, 'rb') as file:
+        data = file.read()
+    written = []
+    for _, suffix, compress in static_encodings():
+        compressed = compress(data)
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as file:
+                file.write(compressed)
+            written.append(path + suffix)
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return written
+
+
+def precompress_folder(folder: str):
+    written = []
+    for directory, _, filenames in os.walk(folder):
+        for name in filenames:
+            if name.lower().endswith(COMPRESSIBLE_SUFFIXES):
+                written.extend(precompress_file(os.path.join(directory, name)))
+    return written
+
+
+def accepted_encodings(encodings):
+    return [(encoding, suffix) for encoding, suffix in encodings if request.accept_encodings[encoding]]
+
+
+class HTMLCompressor:
+    def __init__(self, min_size: int = 1024, level: int = 6, cache_size: int = 64):
+        self.min_size = min_size
+        self.level = level
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def compress(self, etag: str, body: bytes):
+        if etag is None:
+            return gzip.compress(body, compresslevel=self.level)
+        compressed = self._cache.get(etag)
+        if compressed is None:
+            compressed = gzip.compress(body, compresslevel=self.level)
+            self._cache[etag] = compressed
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(etag)
+        return compressed
+
+    async def process(self, response):
+        if response.status_code != 200 or response.mimetype != 'text/html' or 'Content-Encoding' in response.headers \
+                or request.method == 'HEAD':
+            return response
+        response.vary.add('Accept-Encoding')
+        if not request.accept_encodings['gzip']:
+            return response
+        body = await response.get_data()
+        if len(body) < self.min_size:
+            return response
+        etag, weak = response.get_etag()
+        # Only strongly tagged responses are identical between requests, everything else is compressed every time
+        response.set_data(self.compress(None if etag is None or weak else etag, body))
+        response.content_encoding = 'gzip'
+        if etag is not None:
+            response.set_etag(etag + GZIP_ETAG_SUFFIX, weak=weak)
+        return response
+
+
+html_compressor = HTMLCompressor()
+
+
+async def compress_html_response(response):
+    return await html_compressor.process(response)
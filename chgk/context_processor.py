@@ -1,5 +1,12 @@
-from quart import url_for
+from quart import current_app, has_request_context, request, url_for
+
+from chgk.static_files import StaticBlueprint
 
 
 def static_files_context_processor(*path, blueprint='', **kwargs):
-    return url_for(endpoint=f'{blueprint}.static', filename='/'.join(path), **kwargs)
+    filename = '/'.join(path)
+    blueprint_name = blueprint or (request.blueprint if has_request_context() else None)
+    static_blueprint = current_app.blueprints.get(blueprint_name)
+    if isinstance(static_blueprint, StaticBlueprint):
+        filename = static_blueprint.static_url_name(filename)
+    return url_for(endpoint=f'{blueprint}.static', filename=filename, **kwargs)
@@ -1,65 +1,350 @@
-import numpy as np
-from aiomysql import create_pool
-from pymysql import IntegrityError
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from inspect import iscoroutinefunction
+from math import inf
+from weakref import WeakKeyDictionary
 
-from chgk.database_decorators import database_errors_handler
-from chgk.database_exceptions import MultipleObjectsExist, ObjectDoesNotExist
+from chgk.database_backends import get_backend
+from chgk.database_cache import QueryResultCache
+from chgk.database_columns import column_names, to_columns, to_structured_array
+from chgk.database_decorators import database_errors_handler, database_metrics_recorder
+from chgk.database_exceptions import ConnectionPoolDoesNotExist, MultipleObjectsExist, ObjectDoesNotExist
+from chgk.database_loader import BatchLoader
+from chgk.database_metrics import QueryMetrics
+from chgk.database_pool import PoolStatistics
+from chgk.database_query import Condition, Page, QueryResult, WriteResult, chunks, column_indices, \
+    decode_cursor, encode_cursor, insert_if_not_exists_sql, insert_sql, keyset_condition, order_by_parts, select_sql, \
+    to_condition, update_sql
+from chgk.database_rows import make_rows
+from chgk.database_schema import SchemaCache
+from chgk.database_singleflight import SingleFlight
+from chgk.database_transaction import Transaction
 
 
 class DatabaseMeta(type):
     def __new__(cls, name, bases, dct):
         for member_name in dct:
             member = dct[member_name]
-            if callable(member) and not (member_name.startswith('__') or member_name.endswith('__')):
+            if callable(member) and not (member_name.startswith('_') or member_name.endswith('__')):
+                if iscoroutinefunction(member):
+                    member = database_metrics_recorder(member)
                 dct[member_name] = database_errors_handler(member)
         return type.__new__(cls, name, bases, dct)
 
 
 class Database(metaclass=DatabaseMeta):
     _defaults = {}
+    _pool_defaults = {
+        'host': 'localhost',
+        'port': 3306,
+        'unix_socket': None,
+        'minsize': 1,
+        'maxsize': 10,
+        'pool_recycle': -1,
+        'warmup': 0,
+    }
+    stream_fetch_size = 1000
 
-    def __new__(cls, *args, **kwargs):
-        if not hasattr(cls, 'instance'):
-            cls.instance = super(Database, cls).__new__(cls)
-        return cls.instance
-
-    def __init__(self, db: str, user: str, password: str, defaults: dict = None):
+    def __init__(self, db: str, user: str, password: str, defaults: dict = None,
+                 result_cache: dict = None, pool: dict = None, instrumentation: dict = None, replicas: list = None,
+                 replica_routing: str = 'round_robin', read_your_writes_window: float = 1.0,
+                 single_flight: bool = True, row_factory=None, backend=None, schema_ttl: float = 60.0):
         self._connection_pool = None
+        self._connection_pool_lock = asyncio.Lock()
+        self._closed = False
         self.__db = db
         self.__user = user
         self.__password = password
+        self._backend = get_backend(backend)
+        self._schema = SchemaCache(self._backend, ttl=schema_ttl)
+        self._result_cache = QueryResultCache(**result_cache) if result_cache is not None else None
+        self._pool_options = {**self._pool_defaults, **(pool or {})}
+        self._pool_statistics = PoolStatistics()
+        self._metrics = QueryMetrics(**instrumentation) if instrumentation is not None else None
+        self._transaction = ContextVar(f'{db}_transaction_{id(self)}', default=None)
+        if replica_routing not in ('round_robin', 'least_busy'):
+            raise ValueError(f'Unknown replica routing "{replica_routing}"')
+        self._replicas = list(replicas or [])
+        self._replica_pools = []
+        self._replica_routing = replica_routing
+        self._replica_index = 0
+        self._read_your_writes_window = read_your_writes_window
+        self._borrowed_replica_connections = {}
+        self._last_write = ContextVar(f'{db}_last_write_{id(self)}', default=None)
+        self._loaders = WeakKeyDictionary()
+        self._single_flight = SingleFlight() if single_flight else None
+        self._row_factory = row_factory
+        self._table_versions = {}
+        self._tables_written_at = {}
         if defaults is not None:
             self._defaults = defaults
 
+    async def __create_pool(self, pool_options: dict):
+        pool_options = {**self._pool_options, **pool_options}
+        user = pool_options.pop('user', self.__user)
+        password = pool_options.pop('password', self.__password)
+        warmup = min(pool_options.pop('warmup'), pool_options['maxsize'])
+        pool = await self._backend.create_pool(self.__db, user, password, **pool_options)
+        if warmup > pool.size:
+            connections = await asyncio.gather(*(pool.acquire() for _ in range(warmup)))
+            for conn in connections:
+                pool.release(conn)
+        return pool
+
+    @property
+    def name(self):
+        return self.__db
+
+    async def __open_pools(self):
+        pools = await asyncio.gather(
+            self.__create_pool({}),
+            # A replica must not inherit the primary's socket, a client connecting through it ignores host and port
+            *(self.__create_pool({'unix_socket': None, **replica}) for replica in self._replicas))
+        if self._closed:
+            # Shutdown happened while the pools were being created
+            for pool in pools:
+                pool.close()
+            await asyncio.gather(*(pool.wait_closed() for pool in pools))
+            raise ConnectionPoolDoesNotExist(f'Connection pool of "{self.__db}" is closed')
+        self._connection_pool, *self._replica_pools = pools
+        await self.refresh_schema()
+
     async def create_connection_pool(self):
-        self._connection_pool = await create_pool(port=3306, user=self.__user, password=self.__password, db=self.__db)
+        self._closed = False
+        await self.__open_pools()
 
-    def release_connection(self, conn):
-        self._connection_pool.release(conn)
+    async def ensure_connection_pool(self):
+        self._closed = False
+        if self._connection_pool is None:
+            async with self._connection_pool_lock:
+                if self._connection_pool is None:
+                    await self.__open_pools()
 
-    async def close_all_connections(self):
-        if self._connection_pool is not None:
-            self._connection_pool.close()
-            await self._connection_pool.wait_closed()
+    def __choose_replica_pool(self):
+        if self._replica_routing == 'least_busy':
+            return min(self._replica_pools, key=lambda pool: (pool.size - pool.freesize) / pool.maxsize)
+        pool = self._replica_pools[self._replica_index % len(self._replica_pools)]
+        self._replica_index += 1
+        return pool
+
+    def __reads_pinned_to_primary(self):
+        last_write = self._last_write.get()
+        return last_write is not None and time.monotonic() - last_write < self._read_your_writes_window
+
+    def __replicas_may_lag(self, tables: tuple):
+        if not self._replica_pools:
+            return False
+        now = time.monotonic()
+        return any(now - self._tables_written_at.get(table, -inf) < self._read_your_writes_window for table in tables)
+
+    async def _acquire(self, read: bool = False):
+        transaction = self._transaction.get()
+        if transaction is not None:
+            return transaction.connection
+        if self._connection_pool is None:
+            # Tasks outliving shutdown must not reopen pools nobody is left to close
+            if self._closed:
+                raise ConnectionPoolDoesNotExist(f'Connection pool of "{self.__db}" is closed')
+            await self.ensure_connection_pool()
+        if read and self._replica_pools and not self.__reads_pinned_to_primary():
+            pool = self.__choose_replica_pool()
+        else:
+            pool = self._connection_pool
+        self._pool_statistics.waiters += 1
+        started = time.perf_counter()
+        try:
+            conn = await pool.acquire()
+        finally:
+            self._pool_statistics.waiters -= 1
+        elapsed = time.perf_counter() - started
+        self._pool_statistics.acquired += 1
+        self._pool_statistics.acquire_wait.observe(elapsed)
+        if self._metrics is not None:
+            self._metrics.record_acquire(elapsed)
+        if pool is not self._connection_pool:
+            self._borrowed_replica_connections[conn] = pool
+        return conn
+
+    def pool_stats(self):
+        statistics = self._pool_statistics.snapshot(self._connection_pool)
+        if self._replica_pools:
+            statistics['replicas'] = [{
+                'size': pool.size,
+                'free': pool.freesize,
+                'in_use': pool.size - pool.freesize,
+                'minsize': pool.minsize,
+                'maxsize': pool.maxsize,
+            } for pool in self._replica_pools]
+        return statistics
 
-    async def filter(self, table: str, columns: list = None, condition: str = None,
-                     connection=None, close_connection=True, **kwargs):
+    async def refresh_schema(self, table: str = None, connection=None):
         if connection is None:
-            conn = await self._connection_pool.acquire()
+            conn = await self._acquire()
         else:
             conn = connection
-        if columns is None:
-            columns_to_select = '*'
+        try:
+            lock = self.__transaction_lock(conn)
+            if lock is None:
+                await self._schema.load(conn, table)
+            else:
+                async with lock:
+                    await self._schema.load(conn, table)
+        finally:
+            if connection is None:
+                self.release_connection(conn)
+
+    def invalidate_schema(self, table: str = None):
+        self._schema.invalidate(table)
+
+    async def table_schema(self, table: str, connection=None):
+        schema = self._schema.get(table)
+        if schema is None:
+            await self.refresh_schema(table, connection=connection)
+            schema = self._schema.get(table)
+        return schema
+
+    def release_connection(self, conn):
+        transaction = self._transaction.get()
+        if transaction is not None and transaction.connection is conn:
+            return
+        self._borrowed_replica_connections.pop(conn, self._connection_pool).release(conn)
+
+    async def _commit(self, conn):
+        transaction = self._transaction.get()
+        if transaction is None or transaction.connection is not conn:
+            await conn.commit()
+
+    def in_transaction(self):
+        return self._transaction.get() is not None
+
+    @asynccontextmanager
+    async def transaction(self):
+        current_transaction = self._transaction.get()
+        if current_transaction is not None:
+            yield current_transaction
+            return
+        conn = await self._acquire()
+        transaction = Transaction(self, conn)
+        token = self._transaction.set(transaction)
+        try:
+            await conn.begin()
+            yield transaction
+            await conn.commit()
+        except BaseException:
+            await conn.rollback()
+            raise
+        finally:
+            self._transaction.reset(token)
+            self.release_connection(conn)
+        self._invalidate_tables(*transaction.written_tables)
+
+    def __transaction_lock(self, conn):
+        transaction = self._transaction.get()
+        if transaction is not None and transaction.connection is conn:
+            return transaction.lock
+        return None
+
+    async def _execute(self, conn, sql: str, params: tuple = ()):
+        lock = self.__transaction_lock(conn)
+        if lock is None:
+            return await self.__execute(conn, sql, params)
+        async with lock:
+            return await self.__execute(conn, sql, params)
+
+    async def __execute(self, conn, sql: str, params: tuple = ()):
+        started = time.perf_counter()
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params)
+            result = QueryResult(list(await cur.fetchall()), cur.rowcount, cur.lastrowid, cur.description)
+        if self._metrics is not None:
+            elapsed = time.perf_counter() - started
+            rows = len(result.rows) if result.description is not None else max(result.rowcount, 0)
+            if self._metrics.record_query(elapsed, rows):
+                explain = None
+                if self._metrics.explain_slow_queries and sql.lstrip().upper().startswith('SELECT'):
+                    explain = await self.__explain(conn, sql, params)
+                self._metrics.record_slow_query(sql, params, elapsed, rows, explain)
+        return result
+
+    async def __explain(self, conn, sql: str, params: tuple = ()):
+        try:
             async with conn.cursor() as cur:
-                await cur.execute(
-                    f"SELECT COUNT(*) as `count` FROM information_schema.columns WHERE table_name='{table}'")
-                columns_count = list(await cur.fetchall())[0][0]
+                await cur.execute(self._backend.explain_prefix + sql, params)
+                return list(await cur.fetchall())
+        except Exception as ex:
+            return str(ex)
+
+    def query_stats(self):
+        if self._metrics is None:
+            return None
+        return self._metrics.snapshot()
+
+    def reset_query_stats(self):
+        if self._metrics is not None:
+            self._metrics.reset()
+
+    def _with_defaults(self, table: str, columns: list, values: list):
+        table_defaults = self._defaults.get(table)
+        if table_defaults is None:
+            return list(columns), list(values)
+        return list(columns) + list(table_defaults.keys()), list(values) + list(table_defaults.values())
+
+    def _invalidate_tables(self, *tables):
+        transaction = self._transaction.get()
+        if transaction is not None:
+            transaction.written_tables.update(tables)
+            return
+        written_at = time.monotonic()
+        self._last_write.set(written_at)
+        for table in tables:
+            self._table_versions[table] = self._table_versions.get(table, 0) + 1
+            self._tables_written_at[table] = written_at
+        if self._single_flight is not None:
+            self._single_flight.forget(*tables)
+        if self._result_cache is not None:
+            self._result_cache.invalidate(*tables)
+
+    def table_versions(self, *tables):
+        return tuple(self._table_versions.get(table, 0) for table in tables)
+
+    def result_cache_stats(self):
+        if self._result_cache is None:
+            return None
+        return self._result_cache.stats()
+
+    def single_flight_stats(self):
+        if self._single_flight is None:
+            return None
+        return self._single_flight.stats()
+
+    def clear_result_cache(self):
+        if self._result_cache is not None:
+            self._result_cache.clear()
+
+    async def close_all_connections(self):
+        self._closed = True
+        pools = [pool for pool in [self._connection_pool, *self._replica_pools] if pool is not None]
+        for pool in pools:
+            pool.close()
+        await asyncio.gather(*(pool.wait_closed() for pool in pools))
+        self._connection_pool = None
+        self._replica_pools = []
+
+    async def _prepare_select(self, table: str, columns: list = None, condition=None, order_by=None,
+                              limit: int = None, offset: int = None, expression: str = None,
+                              **kwargs):
+        if expression is not None:
+            columns, columns_count = None, 1
+        elif columns is None:
+            columns_count = None
         else:
-            columns_to_select = ','.join('`' + str(item) + '`' for item in columns)
+            columns = tuple(columns)
             columns_count = len(columns)
         join_tables = kwargs.get('join_tables')
         join_conditions = kwargs.get('join_conditions')
-        join_command_part = ''
+        joins = ()
         if join_tables is not None:
             if join_conditions is None:
                 raise AttributeError('"join_tables" cannot be passed without "join_conditions"')
@@ -67,28 +352,236 @@ class Database(metaclass=DatabaseMeta):
                 if len(join_tables) != len(join_conditions):
                     raise AttributeError('Lengths of "join_tables" and "join_conditions" must be the same')
                 else:
-                    for tab, cond in zip(join_tables, join_conditions):
-                        join_command_part += f'JOIN {tab} ON {cond}\n'
+                    joins = tuple(zip(join_tables, join_conditions))
+        tables = (table,) + tuple(join_table.split()[0].strip('`') for join_table, _ in joins)
 
-        db_command = f"SELECT {columns_to_select} FROM `{table}`" + f' {join_command_part}'
-        if condition is not None:
-            db_command += f" WHERE {condition}"
-        async with conn.cursor() as cur:
-            await cur.execute(db_command)
-            result = list(await cur.fetchall())
+        if offset is not None and limit is None:
+            raise ValueError('"offset" cannot be passed without "limit"')
 
-        if columns_count == 1:
-            result = np.asarray(result).reshape(-1).tolist()
+        where = to_condition(condition)
+        params = where.params + tuple(value for value in (limit, offset) if value is not None)
+        db_command = select_sql(table, columns, where.template, joins, order_by_parts(order_by or ()),
+                                limit is not None, offset is not None, expression)
+        return db_command, params, columns_count, tables
+
+    async def _fetch(self, db_command: str, params: tuple, tables: tuple, connection=None, cache=True):
+        in_transaction = self._transaction.get() is not None
+        # Reads pinned to the primary after a write must not be answered from rows cached before it
+        use_cache = cache and self._result_cache is not None and not in_transaction and \
+            not self.__reads_pinned_to_primary()
+        query_result = self._result_cache.get((db_command, params)) if use_cache else None
+        if query_result is not None:
+            return query_result
+        # A write that commits while this query runs must not be hidden behind the rows read before it
+        versions = self.table_versions(*tables) if use_cache else None
+        if connection is not None:
+            query_result = await self._execute(connection, db_command, params)
+        elif self._single_flight is not None and not in_transaction:
+            query_result = await self._single_flight.do((db_command, params, self.__reads_pinned_to_primary()),
+                                                        lambda: self.__read(db_command, params), tags=tables)
+        else:
+            query_result = await self.__read(db_command, params)
+        # Rows a lagging replica returned shortly after a write may predate it and are not cached
+        if use_cache and self.table_versions(*tables) == versions and \
+                (connection is not None or not self.__replicas_may_lag(tables)):
+            self._result_cache.set((db_command, params), query_result, tables)
+        return query_result
+
+    async def filter(self, table: str, columns: list = None, condition=None,
+                     connection=None, close_connection=True, as_columns=False, as_array=False, cache=True,
+                     row_factory=..., **kwargs):
+        db_command, params, columns_count, tables = await self._prepare_select(table, columns, condition, **kwargs)
+        conn = connection
+        if conn is None and not close_connection:
+            conn = await self._acquire()
+        query_result = await self._fetch(db_command, params, tables, connection=conn, cache=cache)
+        if columns_count is None:
+            columns_count = len(query_result.description or ())
+            if len(tables) == 1:
+                self.__check_schema(table, query_result.description)
+
+        if row_factory is Ellipsis:
+            row_factory = self._row_factory
+        if as_array:
+            result = to_structured_array(query_result.rows, query_result.description)
+        elif as_columns:
+            result = to_columns(query_result.rows, query_result.description)
+        elif row_factory is not None:
+            result = make_rows(row_factory, table,
+                               columns if columns is not None else column_names(query_result.description),
+                               query_result.rows)
+        elif columns_count == 1:
+            result = [row[0] for row in query_result.rows]
+        else:
+            result = list(query_result.rows)
         if close_connection:
-            self.release_connection(conn)
+            if conn is not None:
+                self.release_connection(conn)
             return result
         else:
             return result, conn
 
-    async def get(self, table: str, columns: list = None, condition: str = None, **kwargs):
-        result, conn = await self.filter(table=table, columns=columns, condition=condition, close_connection=False,
-                                         **kwargs)
-        self.release_connection(conn)
+    def __check_schema(self, table: str, description):
+        schema = self._schema.get(table)
+        if schema is not None and description is not None \
+                and schema.columns != [column_description[0] for column_description in description]:
+            self._schema.invalidate(table)
+
+    async def exists(self, table: str, condition=None, cache=True, **kwargs):
+        db_command, params, _, tables = await self._prepare_select(table, condition=condition, expression='1',
+                                                                   limit=1, **kwargs)
+        return len((await self._fetch(db_command, params, tables, cache=cache)).rows) > 0
+
+    async def count(self, table: str, condition=None, cache=True, **kwargs):
+        db_command, params, _, tables = await self._prepare_select(table, condition=condition, expression='COUNT(*)',
+                                                                   **kwargs)
+        return (await self._fetch(db_command, params, tables, cache=cache)).rows[0][0]
+
+    async def __read(self, db_command: str, params: tuple):
+        conn = await self._acquire(read=True)
+        try:
+            return await self._execute(conn, db_command, params)
+        finally:
+            self.release_connection(conn)
+
+    async def iter_filter(self, table: str, columns: list = None, condition=None, batch_size: int = None, **kwargs):
+        db_command, params, columns_count, _ = await self._prepare_select(table, columns, condition, **kwargs)
+        fetch_size = batch_size or self.stream_fetch_size
+        conn = await self._acquire(read=True)
+        in_transaction = self._transaction.get() is not None
+        cur = None
+        exhausted = False
+        try:
+            cur = await conn.cursor(self._backend.streaming_cursor)
+            await cur.execute(db_command, params)
+            if columns_count is None:
+                columns_count = len(cur.description or ())
+            while True:
+                rows = await cur.fetchmany(fetch_size)
+                if not rows:
+                    break
+                if columns_count == 1:
+                    rows = [row[0] for row in rows]
+                if batch_size is None:
+                    for row in rows:
+                        yield row
+                else:
+                    yield list(rows)
+            await cur.close()
+            exhausted = True
+        finally:
+            if not exhausted:
+                if in_transaction:
+                    if cur is not None:
+                        await cur.close()
+                else:
+                    # Closing an unbuffered cursor reads the rest of the result set, dropping the connection does not
+                    conn.close()
+            self.release_connection(conn)
+
+    async def paginate(self, table: str, order_by, columns: list = None, condition=None, page_size: int = 50,
+                       cursor: str = None, row_factory=..., **kwargs):
+        row_factory = self._row_factory if row_factory is Ellipsis else row_factory
+        order_by = order_by_parts(order_by)
+        order_columns = [column for column, _ in order_by]
+        schema = await self.table_schema(table)
+        if schema is not None:
+            order_by += tuple((column, False) for column in schema.primary_key if column not in order_columns)
+            order_columns = [column for column, _ in order_by]
+        if columns is None:
+            if schema is None:
+                raise ObjectDoesNotExist(f'Table "{table}" does not exist')
+            columns = schema.columns
+        columns = list(columns)
+        select_columns = columns + [column for column in order_columns if column not in columns]
+        key_indices = [select_columns.index(column) for column in order_columns]
+
+        where = to_condition(condition)
+        if cursor is not None:
+            where &= keyset_condition(order_by, decode_cursor(cursor))
+        rows = await self.filter(table=table, columns=select_columns, condition=where, order_by=order_by,
+                                 limit=page_size + 1, row_factory=None, **kwargs)
+        if len(select_columns) == 1:
+            rows = [(row,) for row in rows]
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor([rows[-1][i] for i in key_indices])
+        if len(select_columns) != len(columns):
+            rows = [row[:len(columns)] for row in rows]
+        if row_factory is not None:
+            rows = make_rows(row_factory, table, columns, rows)
+        elif len(columns) == 1:
+            rows = [row[0] for row in rows]
+        return Page(rows, next_cursor)
+
+    async def get_many(self, table: str, keys, columns: list = None, key_column: str = None, row_factory=...,
+                       **kwargs):
+        row_factory = self._row_factory if row_factory is Ellipsis else row_factory
+        schema = await self.table_schema(table)
+        if key_column is None or columns is None:
+            if schema is None:
+                raise ObjectDoesNotExist(f'Table "{table}" does not exist')
+            if key_column is None:
+                if len(schema.primary_key) != 1:
+                    raise ValueError(f'"key_column" must be passed for table "{table}" without single-column '
+                                     f'primary key')
+                key_column = schema.primary_key[0]
+            if columns is None:
+                columns = schema.columns
+        columns = list(columns)
+        select_columns = columns if key_column in columns else columns + [key_column]
+        key_index = select_columns.index(key_column)
+
+        # Rows come back keyed by the stored value, callers get them under the keys they passed (e.g. '1' for 1)
+        requested_keys = {}
+        for key in keys:
+            requested_keys.setdefault(key if schema is None else schema.normalize(key_column, key), []).append(key)
+
+        found_objs = {}
+        for keys_chunk in chunks(requested_keys, 1000):
+            rows = await self.filter(table=table, columns=select_columns,
+                                     condition=Condition.compare(key_column, 'in', keys_chunk), row_factory=None,
+                                     **kwargs)
+            if len(select_columns) == 1:
+                rows = [(row,) for row in rows]
+            keys_chunk = [row[key_index] for row in rows]
+            rows = [row[:len(columns)] for row in rows] if len(select_columns) != len(columns) else rows
+            if row_factory is not None:
+                rows = make_rows(row_factory, table, columns, rows)
+            elif len(columns) == 1:
+                rows = [row[0] for row in rows]
+            for key, row in zip(keys_chunk, rows):
+                for requested_key in requested_keys.get(key, ()):
+                    found_objs[requested_key] = row
+        return found_objs
+
+    def __loader(self, table: str, columns: list = None):
+        loop = asyncio.get_running_loop()
+        loop_loaders = self._loaders.setdefault(loop, {})
+        loader_key = (table, None if columns is None else tuple(columns))
+        if loader_key not in loop_loaders:
+            loop_loaders[loader_key] = BatchLoader(self, table, loader_key[1])
+        return loop_loaders[loader_key]
+
+    async def get(self, table: str, columns: list = None, condition=None, key=None, **kwargs):
+        if key is not None:
+            if condition is not None:
+                raise ValueError('"key" and "condition" cannot be passed together')
+            if self._transaction.get() is not None or kwargs:
+                found_objs = await self.get_many(table, [key], columns=columns, **kwargs)
+                if key not in found_objs:
+                    raise ObjectDoesNotExist('No objects found')
+                return found_objs[key]
+            schema = await self.table_schema(table)
+            if schema is not None and len(schema.primary_key) == 1:
+                # Rejected here, a key of the wrong type would fail every other key batched with it
+                schema.normalize(schema.primary_key[0], key)
+            return await asyncio.shield(self.__loader(table, columns).load(key))
+
+        kwargs.setdefault('limit', 2)
+        result = await self.filter(table=table, columns=columns, condition=condition, **kwargs)
         if len(result) == 0:
             raise ObjectDoesNotExist('No objects found')
         elif len(result) == 1:
@@ -98,104 +591,134 @@ class Database(metaclass=DatabaseMeta):
 
 
 class CommonDatabase(Database):
-    async def __check_existence(self, table: str, columns: list, values: list,
-                                columns_to_check: list = None, close_connection: bool = True):
-        if columns_to_check is None:
-            columns_check = columns
-            values_check = values
+    async def __create_if_not_exists(self, conn, table: str, columns: list, values: list, columns_to_check: list):
+        check_values = [values[i] for i in column_indices(tuple(columns), tuple(columns_to_check))]
+        where = Condition.equals(columns_to_check, check_values)
+        columns, values = self._with_defaults(table, columns, values)
+        try:
+            result = await self._execute(conn, insert_if_not_exists_sql(table, tuple(columns), where.template),
+                                         tuple(values) + where.params)
+        except Exception as ex:
+            # A concurrent insert won the race past the NOT EXISTS check, any other error is the caller's
+            if not self._backend.is_duplicate_key_error(ex):
+                raise
+            return WriteResult(0, None)
+        await self._commit(conn)
+        self._invalidate_tables(table)
+        return WriteResult(result.rowcount, result.lastrowid)
+
+    async def __insert_chunks(self, table: str, columns: list, rows, chunk_size: int, connection=None,
+                              ignore: bool = False, update_columns: tuple = ()):
+        if connection is None:
+            conn = await self._acquire()
         else:
-            sorter = np.argsort(columns)
-            indices = sorter[np.searchsorted(columns, columns_to_check, sorter=sorter)]
-            columns_check = np.asarray(columns)[indices].tolist()
-            values_check = np.asarray(values)[indices].tolist()
-        exist_condition = ' AND '.join(
-            col + "=" + "'" + str(val) + "'" for col, val in zip(columns_check, values_check))
-        return await self.filter(table=table, columns=columns,
-                                 condition=exist_condition,
-                                 close_connection=close_connection)
+            conn = connection
+        columns, defaults = self._with_defaults(table, columns, [])
+        columns, defaults = tuple(columns), tuple(defaults)
+        affected_rows, last_insert_id = 0, None
+        try:
+            for chunk in chunks(rows, chunk_size):
+                params = tuple(value for row in chunk for value in tuple(row) + defaults)
+                result = await self._execute(conn, insert_sql(table, columns, len(chunk), ignore, update_columns),
+                                             params)
+                await self._commit(conn)
+                self._invalidate_tables(table)
+                affected_rows += result.rowcount
+                last_insert_id = result.lastrowid
+        finally:
+            if connection is None:
+                self.release_connection(conn)
+        return WriteResult(affected_rows, last_insert_id)
 
     async def get_or_create(self, table: str, columns: list, values: list, **kwargs):
-        found_objs, conn = await self.filter(table=table, columns=columns,
-                                             condition=' AND '.join(
-                                                 col + "=" + str(val) for col, val in zip(columns, values)),
-                                             close_connection=False, **kwargs)
-        if len(found_objs) == 0:
-            table_defaults = self._defaults.get(table)
-            if table_defaults is not None:
-                columns += table_defaults.keys()
-                values += table_defaults.values()
-
-            async with conn.cursor() as cur:
-                try:
-                    await cur.execute(f"INSERT INTO `{table}` (" + ','.join(columns) +
-                                      f") VALUES (" + ','.join("'" + str(item) + "'" for item in values) + ")")
-                    await conn.commit()
-                    self.release_connection(conn)
-                    # return await self.get_columns(table=table, columns=columns)
-                except Exception as e:
-                    self.release_connection(conn)
-                    raise Exception(str(e))
-        elif len(found_objs) == 1:
-            self.release_connection(conn)
-            return found_objs
-        else:
+        conn = await self._acquire()
+        try:
+            await self.__create_if_not_exists(conn, table, list(columns), list(values), list(columns))
+            found_objs, _ = await self.filter(table=table, columns=columns,
+                                              condition=Condition.equals(columns, values),
+                                              connection=conn, close_connection=False, **kwargs)
+        finally:
             self.release_connection(conn)
+        if len(found_objs) > 1:
             raise MultipleObjectsExist('More than 1 object found')
+        return found_objs
 
     async def create_if_does_not_exist(self, table: str, columns: list, values: list, columns_to_check: list = None):
-        found_objs, conn = await self.__check_existence(table=table, columns=columns, values=values,
-                                                        columns_to_check=columns_to_check, close_connection=False)
-        if len(found_objs) == 0:
-            table_defaults = self._defaults.get(table)
-            if table_defaults is not None:
-                columns += table_defaults.keys()
-                values += table_defaults.values()
-
-            async with conn.cursor() as cur:
-                try:
-                    await cur.execute(f"INSERT INTO `{table}` (" + ','.join(columns) +
-                                      f") VALUES (" + ','.join("'" + str(item) + "'" for item in values) + ")")
-                    await conn.commit()
-                    self.release_connection(conn)
-                except IntegrityError:
-                    self.release_connection(conn)
-        else:
+        conn = await self._acquire()
+        try:
+            return await self.__create_if_not_exists(conn, table, list(columns), list(values),
+                                                     list(columns if columns_to_check is None else columns_to_check))
+        finally:
             self.release_connection(conn)
 
     async def create(self, table: str, columns: list, values: list, connection=None):
         if connection is None:
-            conn = await self._connection_pool.acquire()
+            conn = await self._acquire()
         else:
             conn = connection
-        table_defaults = self._defaults.get(table)
-        if table_defaults is not None:
-            columns += table_defaults.keys()
-            values += table_defaults.values()
-        async with conn.cursor() as cur:
-            await cur.execute(f"INSERT INTO `{table}` (" + ','.join(columns) +
-                              f") VALUES (" + ','.join("'" + str(item) + "'" for item in values) + ")")
-            await conn.commit()
-        self.release_connection(conn)
+        try:
+            columns, values = self._with_defaults(table, columns, values)
+            result = await self._execute(conn, insert_sql(table, tuple(columns)), tuple(values))
+            await self._commit(conn)
+            self._invalidate_tables(table)
+        finally:
+            if connection is None:
+                self.release_connection(conn)
+        return WriteResult(result.rowcount, result.lastrowid)
+
+    async def create_many(self, table: str, columns: list, rows, chunk_size: int = 500, connection=None):
+        return await self.__insert_chunks(table, columns, rows, chunk_size, connection=connection)
 
-    async def update(self, table: str, columns: list, values: list, condition: str, connection=None):
+    async def update(self, table: str, columns: list, values: list, condition, connection=None):
         if connection is None:
-            conn = await self._connection_pool.acquire()
+            conn = await self._acquire()
         else:
             conn = connection
-        async with conn.cursor() as cur:
-            found_objs, _ = await self.filter(table=table, columns=columns, condition=condition,
-                                              connection=conn, close_connection=False)
-            if len(found_objs) == 0:
+        where = to_condition(condition)
+        try:
+            result = await self._execute(conn, update_sql(table, tuple(columns), where.template),
+                                         tuple(values) + where.params)
+            if result.rowcount == 0:
                 raise ObjectDoesNotExist('Object to update does not exist')
-            else:
-                update_list = ','.join(col + '=' + "'" + str(val) + "'" for col, val in zip(columns, values))
-                await cur.execute(f'UPDATE `{table}` SET {update_list} WHERE {condition}')
-                await conn.commit()
-        self.release_connection(conn)
-
-    async def update_or_create(self, table: str, columns: list, values: list, condition: str):
-        found_objs, conn = await self.filter(table=table, columns=columns, condition=condition, close_connection=False)
-        if len(found_objs) == 0:
-            await self.create(table=table, columns=columns, values=values, connection=conn)
-        else:
-            await self.update(table=table, columns=columns, values=values, condition=condition, connection=conn)
+            await self._commit(conn)
+            self._invalidate_tables(table)
+        finally:
+            if connection is None:
+                self.release_connection(conn)
+        return WriteResult(result.rowcount, result.lastrowid)
+
+    async def update_or_create(self, table: str, columns: list, values: list, condition=None,
+                               update_columns: list = None):
+        if condition is None:
+            if update_columns is None:
+                update_columns = columns
+            columns, values = self._with_defaults(table, columns, values)
+            conn = await self._acquire()
+            try:
+                result = await self._execute(conn, insert_sql(table, tuple(columns),
+                                                              update_columns=tuple(update_columns)), tuple(values))
+                await self._commit(conn)
+                self._invalidate_tables(table)
+            finally:
+                self.release_connection(conn)
+            return WriteResult(result.rowcount, result.lastrowid)
+
+        conn = await self._acquire()
+        try:
+            where = to_condition(condition)
+            result = await self._execute(conn, update_sql(table, tuple(columns), where.template),
+                                         tuple(values) + where.params)
+            if result.rowcount == 0:
+                return await self.create(table=table, columns=columns, values=values, connection=conn)
+            await self._commit(conn)
+            self._invalidate_tables(table)
+        finally:
+            self.release_connection(conn)
+        return WriteResult(result.rowcount, result.lastrowid)
+
+    async def update_or_create_many(self, table: str, columns: list, rows, update_columns: list = None,
+                                    chunk_size: int = 500, connection=None):
+        if update_columns is None:
+            update_columns = columns
+        return await self.__insert_chunks(table, columns, rows, chunk_size, connection=connection,
+                                          update_columns=tuple(update_columns))
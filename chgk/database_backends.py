@@ -0,0 +1,253 @@
+import asyncio
+import re
+import sqlite3
+from functools import lru_cache
+
+
+class DatabaseBackend:
+    name = None
+    streaming_cursor = None
+    explain_prefix = 'EXPLAIN '
+
+    async def create_pool(self, db: str, user: str, password: str, **pool_options):
+        raise NotImplementedError
+
+    async def schema_rows(self, conn, table: str = None):
+        raise NotImplementedError
+
+    def is_duplicate_key_error(self, ex: Exception):
+        raise NotImplementedError
+
+
+class MySQLBackend(DatabaseBackend):
+    name = 'mysql'
+    _columns_query = 'SELECT table_name, column_name, data_type, column_key FROM information_schema.columns ' \
+                     'WHERE table_schema = DATABASE()'
+    _columns_order = ' ORDER BY table_name, ordinal_position'
+
+    def __init__(self):
+        from aiomysql import SSCursor
+        self.streaming_cursor = SSCursor
+
+    async def create_pool(self, db: str, user: str, password: str, **pool_options):
+        from aiomysql import create_pool
+        from pymysql.constants import CLIENT
+        return await create_pool(user=user, password=password, db=db, client_flag=CLIENT.FOUND_ROWS, **pool_options)
+
+    async def schema_rows(self, conn, table: str = None):
+        if table is None:
+            query, args = self._columns_query + self._columns_order, None
+        else:
+            query, args = self._columns_query + ' AND table_name = %s' + self._columns_order, (table,)
+        async with conn.cursor() as cur:
+            await cur.execute(query, args)
+            return list(await cur.fetchall())
+
+    def is_duplicate_key_error(self, ex: Exception):
+        from pymysql import IntegrityError
+        from pymysql.constants import ER
+        return isinstance(ex, IntegrityError) and ex.args[:1] == (ER.DUP_ENTRY,)
+
+
+_placeholder_re = re.compile('%([%s])')
+_on_duplicate_key_update_re = re.compile(r'ON DUPLICATE KEY UPDATE (.+)$')
+_values_function_re = re.compile(r'VALUES\((`[^`]+`)\)')
+
+
+@lru_cache(maxsize=1024)
+def sqlite_sql(sql: str):
+    sql = _placeholder_re.sub(lambda match: '?' if match.group(1) == 's' else '%', sql)
+    sql = sql.replace('INSERT IGNORE INTO ', 'INSERT OR IGNORE INTO ', 1).replace(' FROM DUAL', '')
+    return _on_duplicate_key_update_re.sub(
+        lambda match: 'ON CONFLICT DO UPDATE SET ' + _values_function_re.sub(r'excluded.\1', match.group(1)), sql)
+
+
+class SQLiteCursor:
+    def __init__(self, connection):
+        self._cursor = connection.raw.cursor()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    async def execute(self, sql: str, args=None):
+        self._cursor.execute(sqlite_sql(sql), () if args is None else tuple(args))
+
+    async def fetchall(self):
+        return self._cursor.fetchall()
+
+    async def fetchmany(self, size: int = None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    async def close(self):
+        self._cursor.close()
+
+
+class _SQLiteCursorContext:
+    def __init__(self, connection):
+        self._connection = connection
+        self._cursor = None
+
+    async def __create(self):
+        return SQLiteCursor(self._connection)
+
+    def __await__(self):
+        return self.__create().__await__()
+
+    async def __aenter__(self):
+        self._cursor = SQLiteCursor(self._connection)
+        return self._cursor
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._cursor.close()
+
+
+class SQLiteConnection:
+    def __init__(self, raw):
+        self.raw = raw
+
+    @property
+    def closed(self):
+        return self.raw is None
+
+    def cursor(self, cursor_class=None):
+        return _SQLiteCursorContext(self)
+
+    async def begin(self):
+        if not self.raw.in_transaction:
+            self.raw.execute('BEGIN')
+
+    async def commit(self):
+        self.raw.commit()
+
+    async def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        if self.raw is not None:
+            self.raw.close()
+            self.raw = None
+
+
+class SQLitePool:
+    def __init__(self, connect, minsize: int = 1, maxsize: int = 10):
+        self._connect = connect
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self._free = []
+        self._used = set()
+        self._condition = asyncio.Condition()
+        self._closing = False
+        # A shared in-memory database lives only while at least one connection to it is open
+        self._anchor = connect()
+        for _ in range(minsize):
+            self._free.append(SQLiteConnection(connect()))
+
+    @property
+    def size(self):
+        return len(self._free) + len(self._used)
+
+    @property
+    def freesize(self):
+        return len(self._free)
+
+    async def acquire(self):
+        async with self._condition:
+            while True:
+                if self._free:
+                    conn = self._free.pop()
+                    break
+                if self.size < self.maxsize:
+                    conn = SQLiteConnection(self._connect())
+                    break
+                await self._condition.wait()
+        self._used.add(conn)
+        return conn
+
+    def release(self, conn):
+        self._used.discard(conn)
+        if conn.closed:
+            pass
+        elif self._closing:
+            conn.close()
+        else:
+            if conn.raw.in_transaction:
+                conn.raw.rollback()
+            self._free.append(conn)
+        asyncio.ensure_future(self.__wakeup())
+
+    async def __wakeup(self):
+        async with self._condition:
+            self._condition.notify()
+
+    def close(self):
+        self._closing = True
+        for conn in self._free:
+            conn.close()
+        self._free.clear()
+
+    async def wait_closed(self):
+        for conn in list(self._used):
+            conn.close()
+        self._used.clear()
+        self._anchor.close()
+
+
+class SQLiteBackend(DatabaseBackend):
+    name = 'sqlite'
+
+    async def create_pool(self, db: str, user: str = None, password: str = None, minsize: int = 1, maxsize: int = 10,
+                          **pool_options):
+        if not db or db == ':memory:':
+            db = f'chgk_{id(self)}'
+        if '/' in db or db.endswith('.sqlite3'):
+            def connect():
+                raw = sqlite3.connect(db, check_same_thread=False)
+                raw.execute('PRAGMA journal_mode=WAL')
+                return raw
+        else:
+            def connect():
+                return sqlite3.connect(f'file:{db}?mode=memory&cache=shared', uri=True, check_same_thread=False)
+        return SQLitePool(connect, minsize=minsize, maxsize=maxsize)
+
+    async def schema_rows(self, conn, table: str = None):
+        raw = conn.raw
+        if table is None:
+            tables = [row[0] for row in raw.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                                    "AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        else:
+            tables = [table]
+        rows = []
+        for table_name in tables:
+            for _, column_name, data_type, _, _, primary_key in raw.execute(
+                    f'PRAGMA table_info("{table_name.replace(chr(34), chr(34) * 2)}")'):
+                rows.append((table_name, column_name, data_type.lower(), 'PRI' if primary_key else ''))
+        return rows
+
+    def is_duplicate_key_error(self, ex: Exception):
+        return isinstance(ex, sqlite3.IntegrityError) and str(ex).startswith('UNIQUE constraint failed')
+
+
+backends = {
+    MySQLBackend.name: MySQLBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+
+def get_backend(backend):
+    if backend is None:
+        return MySQLBackend()
+    if isinstance(backend, str):
+        try:
+            return backends[backend]()
+        except KeyError:
+            raise ValueError(f'Unknown database backend "{backend}"')
+    return backend
@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+
+
+class QueryResultCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_table = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __remove(self, key):
+        _, tables, _ = self._entries.pop(key)
+        for table in tables:
+            table_keys = self._keys_by_table.get(table)
+            if table_keys is not None:
+                table_keys.discard(key)
+                if not table_keys:
+                    del self._keys_by_table[table]
+
+    def get(self, key):
+        try:
+            expires_at, _, value = self._entries[key]
+        except (KeyError, TypeError):
+            self.misses += 1
+            return None
+        if expires_at < time.monotonic():
+            self.__remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, tables):
+        try:
+            if key in self._entries:
+                self.__remove(key)
+        except TypeError:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, tuple(tables), value)
+        for table in tables:
+            self._keys_by_table.setdefault(table, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self.__remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, *tables):
+        for table in tables:
+            for key in list(self._keys_by_table.get(table, ())):
+                self.__remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._keys_by_table.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
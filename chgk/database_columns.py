@@ -0,0 +1,53 @@
+import numpy as np
+from pymysql.constants import FIELD_TYPE
+
+
+_integer_types = {FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.LONGLONG, FIELD_TYPE.INT24,
+                  FIELD_TYPE.YEAR}
+_float_types = {FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE}
+
+
+def column_names(description):
+    names = []
+    seen = {}
+    for column_description in description:
+        name = column_description[0]
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}_{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def column_array(values: list, type_code):
+    if type_code in _integer_types:
+        # The cursor description carries no UNSIGNED flag, BIGINT UNSIGNED values past int64 only show up as overflow
+        for dtype in (np.int64, np.uint64):
+            try:
+                return np.fromiter(values, dtype=dtype, count=len(values))
+            except TypeError:
+                break
+            except OverflowError:
+                pass
+        # NULLs cannot be stored in an integer array without losing big values through float conversion
+        return np.array(values, dtype=object)
+    if type_code in _float_types:
+        return np.array(values, dtype=np.float64)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def to_columns(rows: list, description):
+    return {name: column_array([row[i] for row in rows], column_description[1])
+            for i, (name, column_description) in enumerate(zip(column_names(description), description))}
+
+
+def to_structured_array(rows: list, description):
+    columns = to_columns(rows, description)
+    array = np.empty(len(rows), dtype=[(name, column.dtype) for name, column in columns.items()])
+    for name, column in columns.items():
+        array[name] = column
+    return array
@@ -1,4 +1,5 @@
-from inspect import iscoroutinefunction
+import time
+from inspect import isasyncgenfunction, iscoroutinefunction
 
 from pymysql import OperationalError
 
@@ -12,6 +13,8 @@ def database_errors_handler(fun):
             return await fun(*args, **kwargs)
         except (AttributeError, NameError):
             raise ConnectionPoolDoesNotExist('Connection pool does not exist')
+        except (TypeError, ValueError, ConnectionPoolDoesNotExist):
+            raise
         except OperationalError as ex:
             raise ConnectionPoolCannotBeCreated(f'Connection pool cannot be created: {ex}')
         except ObjectDoesNotExist as obj_not_exist_ex:
@@ -19,16 +22,66 @@ def database_errors_handler(fun):
         except Exception as other_ex:
             raise InternalDatabaseError(f'Internal database error: {other_ex}')
 
+    async def async_generator_wrapper(*args, **kwargs):
+        generator = fun(*args, **kwargs)
+        try:
+            async for item in generator:
+                yield item
+        except (AttributeError, NameError):
+            raise ConnectionPoolDoesNotExist('Connection pool does not exist')
+        except (TypeError, ValueError, ConnectionPoolDoesNotExist):
+            raise
+        except OperationalError as ex:
+            raise ConnectionPoolCannotBeCreated(f'Connection pool cannot be created: {ex}')
+        except ObjectDoesNotExist as obj_not_exist_ex:
+            raise ObjectDoesNotExist(str(obj_not_exist_ex))
+        except Exception as other_ex:
+            raise InternalDatabaseError(f'Internal database error: {other_ex}')
+        finally:
+            await generator.aclose()
+
     def sync_wrapper(*args, **kwargs):
         try:
             return fun(*args, **kwargs)
         except (AttributeError, NameError):
             raise ConnectionPoolDoesNotExist('Connection pool does not exist')
+        except (TypeError, ValueError, ConnectionPoolDoesNotExist):
+            raise
         except OperationalError as ex:
             raise ConnectionPoolCannotBeCreated(f'Connection pool cannot be created: {ex}')
         except Exception as other_ex:
             raise InternalDatabaseError(f'Internal database error: {other_ex}')
     if iscoroutinefunction(fun):
         return async_wrapper
+    elif isasyncgenfunction(fun):
+        return async_generator_wrapper
     else:
-        return sync_wrapper
\ No newline at end of file
+        return sync_wrapper
+
+
+def _result_rows(result):
+    rowcount = getattr(result, 'rowcount', None)
+    if rowcount is not None:
+        return max(rowcount, 0)
+    if isinstance(result, list):
+        return len(result)
+    return 0 if result is None else 1
+
+
+def database_metrics_recorder(fun):
+    method_name = fun.__name__
+
+    async def async_wrapper(self, *args, **kwargs):
+        metrics = getattr(self, '_metrics', None)
+        if metrics is None:
+            return await fun(self, *args, **kwargs)
+        table = kwargs.get('table', args[0] if args and isinstance(args[0], str) else None)
+        rows = 0
+        started = time.perf_counter()
+        try:
+            result = await fun(self, *args, **kwargs)
+            rows = _result_rows(result)
+            return result
+        finally:
+            metrics.record_call(method_name, table, time.perf_counter() - started, rows)
+    return async_wrapper
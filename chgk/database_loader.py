@@ -0,0 +1,48 @@
+import asyncio
+
+from chgk.database_exceptions import ObjectDoesNotExist
+
+
+class BatchLoader:
+    def __init__(self, database, table: str, columns: tuple = None):
+        self.database = database
+        self.table = table
+        self.columns = columns
+        self.batches = 0
+        self.loaded_keys = 0
+        self._pending = {}
+        self._scheduled = False
+
+    def load(self, key):
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if not self._scheduled:
+                self._scheduled = True
+                loop.call_soon(self.__dispatch)
+        return future
+
+    def __dispatch(self):
+        pending, self._pending = self._pending, {}
+        self._scheduled = False
+        asyncio.ensure_future(self.__fetch(pending))
+
+    async def __fetch(self, pending: dict):
+        self.batches += 1
+        self.loaded_keys += len(pending)
+        try:
+            rows = await self.database.get_many(self.table, list(pending), columns=self.columns)
+        except Exception as ex:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ex)
+            return
+        for key, future in pending.items():
+            if future.done():
+                continue
+            if key in rows:
+                future.set_result(rows[key])
+            else:
+                future.set_exception(ObjectDoesNotExist('No objects found'))
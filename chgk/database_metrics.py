@@ -0,0 +1,91 @@
+import logging
+import time
+from collections import deque
+
+
+logger = logging.getLogger('chgk.database')
+
+
+class MetricAggregate:
+    __slots__ = ('count', 'total', 'max', 'rows')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+    def observe(self, elapsed: float, rows: int = 0):
+        self.count += 1
+        self.total += elapsed
+        self.rows += rows
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'rows': self.rows,
+        }
+
+
+class QueryMetrics:
+    def __init__(self, slow_query_threshold: float = None, explain_slow_queries: bool = False,
+                 slow_queries_maxlen: int = 100, capture_slow_query_params: bool = False):
+        self.slow_query_threshold = slow_query_threshold
+        self.explain_slow_queries = explain_slow_queries
+        self.capture_slow_query_params = capture_slow_query_params
+        self.by_method = {}
+        self.by_table = {}
+        self.queries = MetricAggregate()
+        self.acquire = MetricAggregate()
+        self.slow_queries = deque(maxlen=slow_queries_maxlen)
+
+    def record_call(self, method: str, table: str, elapsed: float, rows: int):
+        key = (method, table)
+        if key not in self.by_method:
+            self.by_method[key] = MetricAggregate()
+        self.by_method[key].observe(elapsed, rows)
+        if table is not None:
+            if table not in self.by_table:
+                self.by_table[table] = MetricAggregate()
+            self.by_table[table].observe(elapsed, rows)
+
+    def record_acquire(self, elapsed: float):
+        self.acquire.observe(elapsed)
+
+    def record_query(self, elapsed: float, rows: int):
+        self.queries.observe(elapsed, rows)
+        return self.slow_query_threshold is not None and elapsed >= self.slow_query_threshold
+
+    def record_slow_query(self, sql: str, params: tuple, elapsed: float, rows: int, explain=None):
+        # Bound values may hold personal data, only the statement template is logged
+        logger.warning('Slow query (%.3f s, %d rows): %s', elapsed, rows, sql)
+        self.slow_queries.append({
+            'sql': sql,
+            'params': params if self.capture_slow_query_params else None,
+            'elapsed': elapsed,
+            'rows': rows,
+            'explain': explain,
+            'recorded_at': time.time(),
+        })
+
+    def reset(self):
+        self.by_method.clear()
+        self.by_table.clear()
+        self.queries = MetricAggregate()
+        self.acquire = MetricAggregate()
+        self.slow_queries.clear()
+
+    def snapshot(self):
+        return {
+            'queries': self.queries.snapshot(),
+            'acquire': self.acquire.snapshot(),
+            'methods': {f'{method}:{table}' if table is not None else method: aggregate.snapshot()
+                        for (method, table), aggregate in self.by_method.items()},
+            'tables': {table: aggregate.snapshot() for table, aggregate in self.by_table.items()},
+            'slow_queries': list(self.slow_queries),
+        }
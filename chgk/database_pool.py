@@ -0,0 +1,52 @@
+from bisect import bisect_left
+
+
+class AcquireHistogram:
+    bounds = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def snapshot(self):
+        buckets = {f'<={bound}': count for bound, count in zip(self.bounds, self.counts)}
+        buckets['+Inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'buckets': buckets,
+        }
+
+
+class PoolStatistics:
+    def __init__(self):
+        self.waiters = 0
+        self.acquired = 0
+        self.acquire_wait = AcquireHistogram()
+
+    def snapshot(self, pool):
+        statistics = {
+            'waiters': self.waiters,
+            'acquired': self.acquired,
+            'acquire_wait': self.acquire_wait.snapshot(),
+        }
+        if pool is not None:
+            statistics.update({
+                'size': pool.size,
+                'free': pool.freesize,
+                'in_use': pool.size - pool.freesize,
+                'minsize': pool.minsize,
+                'maxsize': pool.maxsize,
+            })
+        return statistics
@@ -0,0 +1,218 @@
+import base64
+import json
+from collections import namedtuple
+from functools import lru_cache
+from itertools import islice
+
+
+QueryResult = namedtuple('QueryResult', ['rows', 'rowcount', 'lastrowid', 'description'])
+WriteResult = namedtuple('WriteResult', ['rowcount', 'lastrowid'])
+Page = namedtuple('Page', ['rows', 'next_cursor'])
+
+
+def quote_name(name: str):
+    return '.'.join('`' + part.replace('`', '``') + '`' for part in str(name).split('.'))
+
+
+def escape_percents(sql: str):
+    return sql.replace('%', '%%')
+
+
+class Condition:
+    __slots__ = ('template', 'params')
+
+    operators = {
+        'exact': '=',
+        'ne': '<>',
+        'gt': '>',
+        'gte': '>=',
+        'lt': '<',
+        'lte': '<=',
+        'like': 'LIKE',
+    }
+
+    def __init__(self, template: str = '', params=()):
+        self.template = template
+        self.params = tuple(params)
+
+    @classmethod
+    def raw(cls, sql: str, *params):
+        if not params:
+            sql = escape_percents(sql)
+        return cls(sql, params)
+
+    @classmethod
+    def compare(cls, column: str, lookup: str, value):
+        if lookup == 'in':
+            values = tuple(value)
+            if not values:
+                return cls('0=1')
+            return cls(f'{quote_name(column)} IN (' + ','.join('%s' for _ in values) + ')', values)
+        if lookup == 'isnull':
+            return cls(f'{quote_name(column)} IS ' + ('NULL' if value else 'NOT NULL'))
+        if value is None and lookup in ('exact', 'ne'):
+            return cls(f'{quote_name(column)} IS ' + ('NULL' if lookup == 'exact' else 'NOT NULL'))
+        try:
+            operator = cls.operators[lookup]
+        except KeyError:
+            raise ValueError(f'Unknown lookup "{lookup}"')
+        return cls(f'{quote_name(column)} {operator} %s', (value,))
+
+    @classmethod
+    def equals(cls, columns, values):
+        condition = cls()
+        for column, value in zip(columns, values):
+            condition &= cls.compare(column, 'exact', value)
+        return condition
+
+    @classmethod
+    def of(cls, **filters):
+        condition = cls()
+        for key, value in filters.items():
+            column, _, lookup = key.partition('__')
+            condition &= cls.compare(column, lookup or 'exact', value)
+        return condition
+
+    def __combine(self, other, operator):
+        other = to_condition(other)
+        if not other.template:
+            return self
+        if not self.template:
+            return other
+        return Condition(f'({self.template}) {operator} ({other.template})', self.params + other.params)
+
+    def __and__(self, other):
+        return self.__combine(other, 'AND')
+
+    def __or__(self, other):
+        return self.__combine(other, 'OR')
+
+    def __invert__(self):
+        return Condition(f'NOT ({self.template})', self.params)
+
+    def __bool__(self):
+        return bool(self.template)
+
+    def __repr__(self):
+        return f'Condition({self.template!r}, {self.params!r})'
+
+
+def to_condition(condition):
+    if condition is None:
+        return Condition()
+    if isinstance(condition, Condition):
+        return condition
+    if isinstance(condition, dict):
+        return Condition.of(**condition)
+    if isinstance(condition, str):
+        return Condition.raw(condition)
+    raise TypeError(f'Condition must be Condition, dict or str, not {type(condition).__name__}')
+
+
+def order_by_parts(order_by):
+    if isinstance(order_by, str):
+        order_by = (order_by,)
+    return tuple(column if isinstance(column, tuple) else (column[1:], True) if column.startswith('-') else
+                 (column, False) for column in order_by)
+
+
+@lru_cache(maxsize=512)
+def select_sql(table: str, columns: tuple = None, where: str = '', joins: tuple = (), order_by: tuple = (),
+               limit: bool = False, offset: bool = False, expression: str = None):
+    if expression is not None:
+        columns_to_select = expression
+    else:
+        columns_to_select = '*' if columns is None else ','.join(quote_name(column) for column in columns)
+    db_command = f'SELECT {columns_to_select} FROM {quote_name(table)}'
+    for join_table, join_condition in joins:
+        db_command += f' JOIN {join_table} ON {escape_percents(join_condition)}'
+    if where:
+        db_command += f' WHERE {where}'
+    if order_by:
+        db_command += ' ORDER BY ' + ','.join(quote_name(column) + (' DESC' if descending else '')
+                                              for column, descending in order_by)
+    if limit:
+        db_command += ' LIMIT %s'
+    if offset:
+        db_command += ' OFFSET %s'
+    return db_command
+
+
+def keyset_condition(order_by: tuple, values):
+    # NULLs sort first in ascending and last in descending order, as in MySQL and SQLite
+    condition = Condition()
+    for i, (column, descending) in enumerate(order_by):
+        if values[i] is None:
+            if descending:
+                continue
+            following = Condition.compare(column, 'isnull', False)
+        elif descending:
+            following = Condition.compare(column, 'lt', values[i]) | Condition.compare(column, 'isnull', True)
+        else:
+            following = Condition.compare(column, 'gt', values[i])
+        preceding_equal = Condition.equals([column for column, _ in order_by[:i]], values[:i])
+        condition |= preceding_equal & following
+    return condition if condition else Condition('0=1')
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(list(values), default=str).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid pagination cursor')
+
+
+@lru_cache(maxsize=512)
+def insert_sql(table: str, columns: tuple, rows_count: int = 1, ignore: bool = False, update_columns: tuple = ()):
+    row_placeholders = '(' + ','.join('%s' for _ in columns) + ')'
+    db_command = ('INSERT IGNORE INTO ' if ignore else 'INSERT INTO ') + quote_name(table) + \
+        ' (' + ','.join(quote_name(column) for column in columns) + ') VALUES ' + \
+        ','.join(row_placeholders for _ in range(rows_count))
+    if update_columns:
+        db_command += ' ON DUPLICATE KEY UPDATE ' + ','.join(f'{quote_name(column)}=VALUES({quote_name(column)})'
+                                                            for column in update_columns)
+    return db_command
+
+
+@lru_cache(maxsize=512)
+def insert_if_not_exists_sql(table: str, columns: tuple, where: str):
+    return f'INSERT INTO {quote_name(table)} (' + ','.join(quote_name(column) for column in columns) + \
+        ') SELECT ' + ','.join('%s' for _ in columns) + \
+        f' FROM DUAL WHERE NOT EXISTS (SELECT 1 FROM {quote_name(table)} WHERE {where})'
+
+
+@lru_cache(maxsize=512)
+def update_sql(table: str, columns: tuple, where: str = ''):
+    db_command = f'UPDATE {quote_name(table)} SET ' + ','.join(quote_name(column) + '=%s' for column in columns)
+    if where:
+        db_command += f' WHERE {where}'
+    return db_command
+
+
+def templates_cache_info():
+    return {
+        'select': select_sql.cache_info(),
+        'insert': insert_sql.cache_info(),
+        'insert_if_not_exists': insert_if_not_exists_sql.cache_info(),
+        'update': update_sql.cache_info(),
+    }
+
+
+@lru_cache(maxsize=512)
+def column_indices(columns: tuple, columns_subset: tuple):
+    positions = {column: i for i, column in enumerate(columns)}
+    return tuple(positions[column] for column in columns_subset)
+
+
+def chunks(iterable, chunk_size: int):
+    if chunk_size < 1:
+        raise ValueError('"chunk_size" must be positive')
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
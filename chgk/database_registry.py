@@ -0,0 +1,86 @@
+import asyncio
+from importlib import import_module
+
+from chgk.database import CommonDatabase
+
+
+_database_options = ('defaults', 'result_cache', 'pool', 'instrumentation', 'replicas',
+                     'replica_routing', 'read_your_writes_window', 'single_flight', 'row_factory', 'backend',
+                     'schema_ttl')
+
+
+def database_from_settings(database_info: dict, database_class=CommonDatabase):
+    return database_class(database_info['name'], user=database_info['user'], password=database_info['password'],
+                          **{option: database_info[option] for option in _database_options if option in database_info})
+
+
+class DatabaseRegistry:
+    def __init__(self, default: str = None):
+        self._databases = {}
+        self.default = default
+
+    @classmethod
+    def from_settings(cls, databases_info: dict, database_class=CommonDatabase):
+        registry = cls(default=databases_info.get('default'))
+        registry.register_settings(databases_info, database_class=database_class)
+        return registry
+
+    def register(self, alias: str, database):
+        self._databases[alias] = database
+        if self.default is None:
+            self.default = alias
+        return database
+
+    def register_settings(self, databases_info: dict, prefix: str = '', database_class=CommonDatabase):
+        for alias, database_info in databases_info.items():
+            if isinstance(database_info, dict):
+                self.register(prefix + alias, database_from_settings(database_info, database_class=database_class))
+
+    def register_blueprints(self, blueprint_names, database_class=CommonDatabase):
+        for blueprint_name in blueprint_names:
+            if any(alias.startswith(f'{blueprint_name}.') for alias in self._databases):
+                continue
+            try:
+                databases_info = import_module(f'{blueprint_name}.settings').DATABASES_INFO
+            except (ModuleNotFoundError, AttributeError):
+                continue
+            self.register_settings(databases_info, prefix=f'{blueprint_name}.', database_class=database_class)
+
+    def get(self, alias: str = None):
+        return self._databases[self.default if alias is None else alias]
+
+    def for_blueprint(self, blueprint_name: str, alias: str = None):
+        blueprint_alias = f'{blueprint_name}.{self.default if alias is None else alias}'
+        if blueprint_alias in self._databases:
+            return self._databases[blueprint_alias]
+        return self.get(alias)
+
+    def __getitem__(self, alias: str):
+        return self._databases[alias]
+
+    def __contains__(self, alias: str):
+        return alias in self._databases
+
+    def __iter__(self):
+        return iter(self._databases)
+
+    def items(self):
+        return self._databases.items()
+
+    def databases(self):
+        unique_databases = []
+        for database in self._databases.values():
+            if all(database is not registered for registered in unique_databases):
+                unique_databases.append(database)
+        return unique_databases
+
+    def invalidate_schema(self, db_name: str = None):
+        for database in self.databases():
+            if db_name is None or database.name == db_name:
+                database.invalidate_schema()
+
+    async def open_all(self):
+        await asyncio.gather(*(database.ensure_connection_pool() for database in self.databases()))
+
+    async def close_all(self):
+        await asyncio.gather(*(database.close_all_connections() for database in self.databases()))
@@ -0,0 +1,20 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+
+def row_class_name(table: str):
+    name = ''.join(part.capitalize() for part in re.split(r'[\W_]+', table) if part)
+    if not name or name[0].isdigit():
+        name = 'Table' + name
+    return name + 'Row'
+
+
+@lru_cache(maxsize=256)
+def row_class(table: str, columns: tuple):
+    # namedtuple classes have empty __slots__, so rows keep the memory footprint of plain tuples
+    return namedtuple(row_class_name(table), [column.split('.')[-1] for column in columns], rename=True)
+
+
+def make_rows(row_factory, table: str, columns, rows):
+    return list(map(row_factory(table, tuple(columns))._make, rows))
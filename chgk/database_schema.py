@@ -0,0 +1,84 @@
+import time
+
+
+_integer_types = frozenset(('tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint'))
+_text_types = frozenset(('char', 'varchar', 'tinytext', 'text', 'mediumtext', 'longtext'))
+
+
+class TableSchema:
+    __slots__ = ('name', 'columns', 'types', 'primary_key')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.columns = []
+        self.types = {}
+        self.primary_key = []
+
+    def add_column(self, column: str, data_type: str, column_key: str):
+        self.columns.append(column)
+        self.types[column] = data_type
+        if column_key == 'PRI':
+            self.primary_key.append(column)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def normalize(self, column: str, value):
+        data_type = self.types.get(column)
+        if data_type in _integer_types and not isinstance(value, int):
+            try:
+                if isinstance(value, (str, bytes)) or (isinstance(value, float) and value.is_integer()):
+                    return int(value)
+            except ValueError:
+                pass
+            raise TypeError(f'Value {value!r} does not match type "{data_type}" of column "{column}"')
+        if data_type in _text_types and isinstance(value, int):
+            return str(value)
+        return value
+
+
+class SchemaCache:
+    def __init__(self, backend, ttl: float = None):
+        self._backend = backend
+        self.ttl = ttl
+        self._tables = {}
+        self._loaded_at = {}
+        self.loaded = False
+
+    def __contains__(self, table):
+        return self.get(table) is not None
+
+    def get(self, table: str):
+        schema = self._tables.get(table)
+        # Other processes (e.g. "migrate") cannot reach this cache, so entries are reloaded after ttl seconds
+        if schema is not None and self.ttl is not None and time.monotonic() - self._loaded_at[table] > self.ttl:
+            self.invalidate(table)
+            return None
+        return schema
+
+    async def load(self, conn, table: str = None):
+        rows = await self._backend.schema_rows(conn, table)
+
+        tables = {}
+        for table_name, column_name, data_type, column_key in rows:
+            if table_name not in tables:
+                tables[table_name] = TableSchema(table_name)
+            tables[table_name].add_column(column_name, data_type, column_key)
+        loaded_at = time.monotonic()
+        if table is None:
+            self._tables = tables
+            self._loaded_at = dict.fromkeys(tables, loaded_at)
+            self.loaded = True
+        else:
+            self._tables.update(tables)
+            self._loaded_at.update(dict.fromkeys(tables, loaded_at))
+        return tables
+
+    def invalidate(self, table: str = None):
+        if table is None:
+            self._tables = {}
+            self._loaded_at = {}
+            self.loaded = False
+        else:
+            self._tables.pop(table, None)
+            self._loaded_at.pop(table, None)
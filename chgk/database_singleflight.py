@@ -0,0 +1,50 @@
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self._in_flight = {}
+        self.calls = 0
+        self.executed = 0
+        self.collapsed = 0
+
+    def __len__(self):
+        return len(self._in_flight)
+
+    def __done(self, key, future):
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None and in_flight[0] is future:
+            del self._in_flight[key]
+        if not future.cancelled():
+            future.exception()
+
+    async def do(self, key, factory, tags=()):
+        self.calls += 1
+        try:
+            in_flight = self._in_flight.get(key)
+        except TypeError:
+            self.executed += 1
+            return await factory()
+        if in_flight is not None:
+            self.collapsed += 1
+            return await asyncio.shield(in_flight[0])
+
+        # The query runs in its own task, so cancelling the caller that started it does not fail the others
+        future = asyncio.ensure_future(factory())
+        self._in_flight[key] = (future, frozenset(tags))
+        future.add_done_callback(lambda done_future: self.__done(key, done_future))
+        self.executed += 1
+        return await asyncio.shield(future)
+
+    def forget(self, *tags):
+        tags = set(tags)
+        for key in [key for key, (_, key_tags) in self._in_flight.items() if not tags.isdisjoint(key_tags)]:
+            del self._in_flight[key]
+
+    def stats(self):
+        return {
+            'in_flight': len(self._in_flight),
+            'calls': self.calls,
+            'executed': self.executed,
+            'collapsed': self.collapsed,
+        }
@@ -0,0 +1,13 @@
+import asyncio
+
+
+class Transaction:
+    def __init__(self, database, connection):
+        self.database = database
+        self.connection = connection
+        self.written_tables = set()
+        # Tasks started inside the transaction share its connection, which runs one statement at a time
+        self.lock = asyncio.Lock()
+
+    def __getattr__(self, item):
+        return getattr(self.database, item)
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+from collections import deque, namedtuple
+from itertools import count
+
+from settings import LIVE_UPDATES_QUEUE_SIZE
+
+
+LiveEvent = namedtuple('LiveEvent', ('id', 'topic', 'data', 'sse'))
+
+logger = logging.getLogger('chgk.live_updates')
+
+_closed = object()
+
+
+def sse_message(event_id: int, topic: str, data: str):
+    lines = ''.join(f'data: {line}\n' for line in data.split('\n'))
+    return f'id: {event_id}\nevent: {topic}\n{lines}\n'.encode()
+
+
+class Subscription:
+    def __init__(self, hub, topic: str, queue_size: int):
+        self.hub = hub
+        self.topic = topic
+        # A slow client only loses the oldest pending states, the newest score is always delivered
+        self._events = deque(maxlen=queue_size)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def put(self, event):
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+        self._events.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: float = None):
+        if not self._events:
+            self._ready.clear()
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        event = self._events.popleft()
+        if event is _closed:
+            self._events.append(event)
+            return None
+        return event
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+
+class LiveUpdatesHub:
+    def __init__(self, queue_size: int = 16):
+        self.queue_size = queue_size
+        self._subscriptions = {}
+        self._latest = {}
+        self._ids = count(1)
+        self.broker = None
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, topic: str):
+        subscription = Subscription(self, topic, self.queue_size)
+        self._subscriptions.setdefault(topic, set()).add(subscription)
+        latest = self._latest.get(topic)
+        if latest is not None:
+            subscription.put(latest)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.topic)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.topic]
+
+    def subscribers(self, topic: str = None):
+        if topic is None:
+            return sum(map(len, self._subscriptions.values()))
+        return len(self._subscriptions.get(topic, ()))
+
+    def publish(self, topic: str, data):
+        if '\n' in topic:
+            raise ValueError(f'Invalid live updates topic "{topic}"')
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        # Encoded first, so an event too large for the other workers is rejected before anyone receives it
+        datagram = None if self.broker is None else self.broker.encode(topic, payload)
+        event = self.publish_local(topic, payload)
+        if datagram is not None:
+            self.broker.send(datagram)
+        return event
+
+    def publish_local(self, topic: str, payload: str):
+        event_id = next(self._ids)
+        event = LiveEvent(event_id, topic, payload, sse_message(event_id, topic, payload))
+        self._latest[topic] = event
+        self.published += 1
+        for subscription in self._subscriptions.get(topic, ()):
+            subscription.put(event)
+        self.delivered += len(self._subscriptions.get(topic, ()))
+        return event
+
+    def start_broker(self, directory: str):
+        self.broker = UnixDatagramBroker(self, directory)
+        self.broker.start()
+        return self.broker
+
+    def close(self):
+        if self.broker is not None:
+            self.broker.close()
+            self.broker = None
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.put(_closed)
+
+    def stats(self):
+        return {
+            'topics': len(self._subscriptions),
+            'subscribers': self.subscribers(),
+            'published': self.published,
+            'delivered': self.delivered,
+            'dropped': sum(subscription.dropped for subscriptions in self._subscriptions.values()
+                           for subscription in subscriptions),
+        }
+
+
+class UnixDatagramBroker:
+    max_datagram_size = 65536
+
+    def __init__(self, hub: LiveUpdatesHub, directory: str):
+        self.hub = hub
+        self.directory = directory
+        self.path = os.path.join(directory, f'{os.getpid()}.sock')
+        self._socket = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self._socket.bind(self.path)
+        asyncio.get_running_loop().add_reader(self._socket.fileno(), self.__receive)
+
+    def __receive(self):
+        while True:
+            try:
+                datagram = self._socket.recv(self.max_datagram_size)
+            except (BlockingIOError, InterruptedError):
+                return
+            topic, _, payload = datagram.decode().partition('\n')
+            self.hub.publish_local(topic, payload)
+
+    def peers(self):
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.sock') and path != self.path:
+                yield path
+
+    def encode(self, topic: str, payload: str):
+        datagram = f'{topic}\n{payload}'.encode()
+        if len(datagram) > self.max_datagram_size:
+            raise ValueError(f'Live update of {len(datagram)} bytes exceeds the broker limit of '
+                             f'{self.max_datagram_size} bytes')
+        return datagram
+
+    def send(self, datagram: bytes):
+        for path in self.peers():
+            try:
+                self._socket.sendto(datagram, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The worker that owned this socket is gone
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            except BlockingIOError:
+                pass
+            except OSError as ex:
+                logger.warning('Live update was not forwarded to %s: %s', path, ex)
+
+    def close(self):
+        if self._socket is None:
+            return
+        asyncio.get_running_loop().remove_reader(self._socket.fileno())
+        self._socket.close()
+        self._socket = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+live_hub = LiveUpdatesHub(queue_size=LIVE_UPDATES_QUEUE_SIZE)
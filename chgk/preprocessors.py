@@ -1,13 +1,51 @@
+import asyncio
+import os
+
+from jinja2 import FileSystemBytecodeCache
+from quart import current_app
+
 from chgk.context_processor import static_files_context_processor
-from settings import db
+from chgk.live_updates import live_hub
+from chgk.static_files import StaticBlueprint
+from settings import LIVE_UPDATES_BROKER_DIR, TEMPLATE_BYTECODE_CACHE_DIR, databases
+
+
+warmup_hooks = []
+
+
+def warmup_hook(fun):
+    warmup_hooks.append(fun)
+    return fun
+
+
+def precompile_templates(app, bytecode_cache_dir: str = None):
+    jinja_env = app.jinja_env
+    if bytecode_cache_dir:
+        os.makedirs(bytecode_cache_dir, exist_ok=True)
+        jinja_env.bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+    templates = jinja_env.list_templates()
+    for template_name in templates:
+        jinja_env.get_template(template_name)
+    return templates
+
+
+warmup_hook(databases.open_all)
 
 
 async def on_startup():
-    await db.create_connection_pool()
+    databases.register_blueprints(blueprint.import_name.split('.')[0] for blueprint in current_app.blueprints.values())
+    for blueprint in current_app.blueprints.values():
+        if isinstance(blueprint, StaticBlueprint):
+            blueprint.load_static_manifest()
+    precompile_templates(current_app, TEMPLATE_BYTECODE_CACHE_DIR)
+    if LIVE_UPDATES_BROKER_DIR:
+        live_hub.start_broker(LIVE_UPDATES_BROKER_DIR)
+    await asyncio.gather(*(hook() for hook in warmup_hooks))
 
 
 async def on_shutdown():
-    await db.close_all_connections()
+    live_hub.close()
+    await databases.close_all()
 
 
 async def context_processor():
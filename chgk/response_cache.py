@@ -0,0 +1,105 @@
+import hashlib
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+from quart import Response, make_response, request
+
+from chgk.compression import GZIP_ETAG_SUFFIX
+
+from settings import RESPONSE_CACHE_TTL, databases
+
+
+CachedPage = namedtuple('CachedPage', ('body', 'content_type', 'etag', 'expires'))
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = 256, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._pages = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.not_modified = 0
+
+    def __len__(self):
+        return len(self._pages)
+
+    def get(self, key):
+        page = self._pages.get(key)
+        if page is not None and page.expires is not None and page.expires <= time.monotonic():
+            del self._pages[key]
+            self.expired += 1
+            page = None
+        if page is None:
+            self.misses += 1
+            return None
+        self._pages.move_to_end(key)
+        self.hits += 1
+        return page
+
+    def set(self, key, body: bytes, content_type: str, max_age: float = None):
+        max_age = self.ttl if max_age is None else max_age
+        page = CachedPage(body, content_type, hashlib.blake2b(body, digest_size=16).hexdigest(),
+                          None if max_age is None else time.monotonic() + max_age)
+        self._pages[key] = page
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.maxsize:
+            self._pages.popitem(last=False)
+        return page
+
+    def invalidate(self, *endpoints):
+        if not endpoints:
+            self._pages.clear()
+            return
+        for key in [key for key in self._pages if key[0] in endpoints]:
+            del self._pages[key]
+
+    def stats(self):
+        return {
+            'size': len(self._pages),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'not_modified': self.not_modified,
+        }
+
+
+# Table versions only count writes made by this process, the TTL bounds staleness from other workers
+response_cache = ResponseCache(ttl=RESPONSE_CACHE_TTL)
+
+
+def page_response(page: CachedPage, cache: ResponseCache):
+    for etag in (page.etag, page.etag + GZIP_ETAG_SUFFIX):
+        if etag in request.if_none_match:
+            cache.not_modified += 1
+            response = Response(b'', status=304)
+            response.set_etag(etag)
+            response.vary.add('Accept-Encoding')
+            return response
+    response = Response(page.body, content_type=page.content_type)
+    response.set_etag(page.etag)
+    return response
+
+
+def cached_page(*tables, database: str = None, cache: ResponseCache = None, max_age: float = None):
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(**kwargs):
+            page_cache = response_cache if cache is None else cache
+            if request.method not in ('GET', 'HEAD'):
+                return await view(**kwargs)
+            data_version = databases.get(database).table_versions(*tables) if tables else ()
+            key = (request.endpoint, tuple(sorted(kwargs.items())), request.query_string, data_version)
+            page = page_cache.get(key)
+            if page is None:
+                response = await make_response(await view(**kwargs))
+                if response.status_code != 200:
+                    return response
+                page = page_cache.set(key, await response.get_data(), response.content_type, max_age=max_age)
+            return page_response(page, page_cache)
+        return wrapper
+    return decorator
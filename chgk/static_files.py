@@ -0,0 +1,163 @@
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from quart import Blueprint
+from quart.helpers import send_from_directory
+from werkzeug.utils import safe_join
+
+from chgk.compression import COMPRESSED_SUFFIXES, STATIC_VARIANTS, accepted_encodings
+
+
+MANIFEST_NAME = 'static_manifest.json'
+HASH_LENGTH = 12
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+STALE_MAX_AGE = 60
+
+_hashed_name_re = re.compile(rf'^(?P<stem>.+)\.[0-9a-f]{{{HASH_LENGTH}}}(?P<suffix>\.[^./]+)$')
+
+
+def file_hash(path: str):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(filename: str, digest: str):
+    directory, name = os.path.split(filename)
+    stem, suffix = os.path.splitext(name)
+    return os.path.join(directory, f'{stem}.{digest}{suffix}').replace(os.sep, '/')
+
+
+class StaticManifest:
+    def __init__(self, folder: str, path: str):
+        self.folder = folder
+        self.path = path
+        self.files = {}
+        self._stats = {}
+        self._originals = {}
+
+    def static_files(self):
+        for directory, _, filenames in os.walk(self.folder):
+            for name in filenames:
+                filename = os.path.relpath(os.path.join(directory, name), self.folder).replace(os.sep, '/')
+                if not filename.endswith(COMPRESSED_SUFFIXES):
+                    yield filename
+
+    def build(self, verify: bool = True):
+        files, stats = {}, {}
+        for filename in sorted(self.static_files()):
+            file_stat = os.stat(os.path.join(self.folder, filename))
+            stats[filename] = [file_stat.st_size, file_stat.st_mtime_ns]
+            # Files left untouched since the manifest was written keep their hash, everything else is rehashed
+            if verify and self._stats.get(filename) == stats[filename] and filename in self.files:
+                files[filename] = self.files[filename]
+            else:
+                files[filename] = hashed_name(filename, file_hash(os.path.join(self.folder, filename)))
+        self.files, self._stats = files, stats
+        self._originals = {hashed: filename for filename, hashed in self.files.items()}
+        return self.files
+
+    def load(self):
+        try:
+            with open(self.path) as file:
+                manifest = json.load(file)
+            self.files, self._stats = dict(manifest['files']), dict(manifest['stats'])
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            self.files, self._stats = {}, {}
+            return False
+        self._originals = {hashed: filename for filename, hashed in self.files.items()}
+        return True
+
+    def save(self):
+        with open(self.path, 'w') as file:
+            json.dump({'files': self.files, 'stats': self._stats}, file, indent=2, sort_keys=True)
+
+    def url_name(self, filename: str):
+        return self.files.get(filename, filename)
+
+    def resolve(self, filename: str):
+        original = self._originals.get(filename)
+        if original is not None:
+            return original, True
+        directory, name = os.path.split(filename)
+        match = _hashed_name_re.match(name)
+        if match is not None:
+            original = os.path.join(directory, match.group('stem') + match.group('suffix')).replace(os.sep, '/')
+            # A hash from an earlier deploy still serves the current file, but only briefly cached
+            if original in self.files:
+                return original, False
+        return filename, None
+
+
+class StaticBlueprint(Blueprint):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.static_manifest = None
+        self._static_variants = {}
+
+    def load_static_manifest(self, rebuild: bool = False):
+        if not self.has_static_folder:
+            return None
+        # Kept next to the blueprint, not inside the folder it describes, so it is never served
+        manifest = StaticManifest(self.static_folder, os.path.join(self.root_path, MANIFEST_NAME))
+        if not rebuild:
+            manifest.load()
+        manifest.build(verify=not rebuild)
+        self.static_manifest = manifest
+        self._static_variants = {}
+        return manifest
+
+    def static_url_name(self, filename: str):
+        if self.static_manifest is None:
+            return filename
+        return self.static_manifest.url_name(filename)
+
+    def __variants(self, filename: str):
+        path = safe_join(self.static_folder, filename)
+        try:
+            modified = os.stat(path).st_mtime_ns if path is not None else None
+        except OSError:
+            modified = None
+        if modified is None:
+            return ()
+        cached = self._static_variants.get(filename)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+        variants = []
+        for encoding, suffix in STATIC_VARIANTS:
+            try:
+                # A variant older than its source was compressed from bytes that are no longer served
+                if os.stat(path + suffix).st_mtime_ns >= modified:
+                    variants.append((encoding, suffix))
+            except OSError:
+                pass
+        self._static_variants[filename] = (modified, tuple(variants))
+        return tuple(variants)
+
+    async def send_static_file(self, filename: str):
+        if not self.has_static_folder:
+            return await super().send_static_file(filename)
+        original, current = filename, None
+        if self.static_manifest is not None:
+            original, current = self.static_manifest.resolve(filename)
+        cache_timeout = None if current is None else IMMUTABLE_MAX_AGE if current else STALE_MAX_AGE
+        variants = self.__variants(original)
+        encodings = accepted_encodings(variants)
+        if encodings:
+            encoding, suffix = encodings[0]
+            mimetype = mimetypes.guess_type(original)[0] or 'application/octet-stream'
+            response = await send_from_directory(self.static_folder, original + suffix, mimetype=mimetype,
+                                                 cache_timeout=cache_timeout)
+            response.content_encoding = encoding
+        else:
+            response = await send_from_directory(self.static_folder, original, cache_timeout=cache_timeout)
+        if variants:
+            response.vary.add('Accept-Encoding')
+        if current is not None:
+            response.cache_control.immutable = current
+        return response
@@ -1,11 +1,12 @@
-from quart import Blueprint
-
 from chgk.preprocessors import context_processor
-from chgk.views import index
+from chgk.static_files import StaticBlueprint
+from chgk.views import index, live_events, live_websocket
 
 
-game_blueprint = Blueprint('chgk', __name__, template_folder='templates', static_folder='static')
+game_blueprint = StaticBlueprint('chgk', __name__, template_folder='templates', static_folder='static')
 
 game_blueprint.context_processor(context_processor)
 
 game_blueprint.add_url_rule('/', view_func=index)
+game_blueprint.add_url_rule('/live/<topic>/events', view_func=live_events)
+game_blueprint.add_websocket('/live/<topic>/ws', view_func=live_websocket)
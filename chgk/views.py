@@ -1,5 +1,78 @@
-from quart import render_template
+import asyncio
+import random
 
+from quart import make_response, render_template, websocket
 
+from chgk.live_updates import live_hub
+from chgk.response_cache import cached_page
+from settings import LIVE_STREAM_MAX_AGE
+
+
+LIVE_HEARTBEAT = 15
+LIVE_RECONNECT_DELAY = 1000
+
+
+def live_stream_deadline():
+    # Streams end on their own so a graceful shutdown never waits on them, jitter spreads the reconnects
+    return asyncio.get_running_loop().time() + LIVE_STREAM_MAX_AGE * random.uniform(0.8, 1)
+
+
+async def next_live_event(subscription, deadline: float):
+    while True:
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            return None, False
+        try:
+            return await subscription.get(timeout=min(LIVE_HEARTBEAT, remaining)), False
+        except asyncio.TimeoutError:
+            if remaining > LIVE_HEARTBEAT:
+                return None, True
+
+
+@cached_page()
 async def index():
     return await render_template('index.html')
+
+
+async def live_events(topic: str):
+    subscription = live_hub.subscribe(topic)
+    deadline = live_stream_deadline()
+
+    async def stream():
+        try:
+            yield f'retry: {LIVE_RECONNECT_DELAY}\n\n'.encode()
+            while True:
+                event, heartbeat = await next_live_event(subscription, deadline)
+                if heartbeat:
+                    yield b': ping\n\n'
+                    continue
+                if event is None:
+                    return
+                yield event.sse
+        finally:
+            subscription.close()
+
+    response = await make_response(stream(), {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    response.timeout = None
+    return response
+
+
+async def live_websocket(topic: str):
+    subscription = live_hub.subscribe(topic)
+    deadline = live_stream_deadline()
+    try:
+        while True:
+            event, heartbeat = await next_live_event(subscription, deadline)
+            if heartbeat:
+                continue
+            if event is None:
+                break
+            await websocket.send(event.data)
+    finally:
+        subscription.close()
+    # 1012 (service restart) tells the client to reconnect
+    await websocket.close(1012)
@@ -1,6 +1,8 @@
+import argparse
 import datetime
 import os.path
 import re
+import tempfile
 import traceback
 from copy import deepcopy
 from importlib import import_module
@@ -9,6 +11,8 @@ from mysql.connector import pooling, ProgrammingError
 
 import settings
 from app_settings import app
+from chgk.compression import precompress_folder
+from chgk.static_files import StaticBlueprint
 from settings import DATABASES_INFO
 
 
@@ -202,6 +206,8 @@ class Migration:
                 try:
                     cur.execute(migration_operations)
                     conn.commit()
+                    settings.databases.invalidate_schema(
+                        self.blueprints_db_settings[blueprint_name][migration_db_folder]['name'])
                     self.applied_migrations.append(migration_module_path)
                     self.migrations_for_db.append(str((blueprint_name, migration_db_folder,
                                                        migration, str(datetime.datetime.now()),)))
@@ -851,6 +857,65 @@ class Migration:
             print(err)
 
 
+def build_static_manifest():
+    for blueprint in app.blueprints.values():
+        if not isinstance(blueprint, StaticBlueprint):
+            continue
+        manifest = blueprint.load_static_manifest(rebuild=True)
+        if manifest is None:
+            continue
+        manifest.save()
+        print(CMDStyle.green + f'Static manifest for "{blueprint.name}": {len(manifest.files)} files' + CMDStyle.reset)
+
+
+def compress_static():
+    for blueprint in app.blueprints.values():
+        if not blueprint.has_static_folder:
+            continue
+        written = precompress_folder(blueprint.static_folder)
+        print(CMDStyle.green + f'Compressed static files for "{blueprint.name}": {len(written)} written' +
+              CMDStyle.reset)
+
+
+def serve(*args):
+    parser = argparse.ArgumentParser(prog='serve', description='Serve the app with hypercorn')
+    parser.add_argument('--bind', nargs='+', default=[os.getenv('SERVER_BIND', '127.0.0.1:5000')])
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SERVER_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--uvloop', action='store_true', default=os.getenv('SERVER_UVLOOP', '') == '1')
+    parser.add_argument('--keep-alive', type=float, default=float(os.getenv('SERVER_KEEP_ALIVE', 5)))
+    parser.add_argument('--backlog', type=int, default=int(os.getenv('SERVER_BACKLOG', 2048)))
+    parser.add_argument('--graceful-timeout', type=float, default=float(os.getenv('SERVER_GRACEFUL_TIMEOUT', 30)))
+    parser.add_argument('--access-log', default=os.getenv('SERVER_ACCESS_LOG'))
+    options = parser.parse_args(args)
+
+    from hypercorn.config import Config
+    from hypercorn.run import run
+
+    if options.workers > 1 and not settings.LIVE_UPDATES_BROKER_DIR:
+        # Workers are spawned and read settings from the environment, so they all join the same broker
+        os.environ['LIVE_UPDATES_BROKER_DIR'] = tempfile.mkdtemp(prefix='chgk-live-')
+        print(CMDStyle.orange + f'LIVE_UPDATES_BROKER_DIR is not set, live updates of {options.workers} workers are '
+              f'synced through {os.environ["LIVE_UPDATES_BROKER_DIR"]}' + CMDStyle.reset)
+    if options.graceful_timeout < settings.LIVE_STREAM_MAX_AGE:
+        print(CMDStyle.orange + f'Graceful timeout is shorter than LIVE_STREAM_MAX_AGE '
+              f'({settings.LIVE_STREAM_MAX_AGE}s), open live streams will be cut off on shutdown' + CMDStyle.reset)
+
+    config = Config()
+    # Each worker imports the app itself and runs before_serving/after_serving, so pools are per process
+    config.application_path = 'app_settings:app'
+    config.bind = options.bind
+    config.workers = options.workers
+    config.worker_class = 'uvloop' if options.uvloop else 'asyncio'
+    config.keep_alive_timeout = options.keep_alive
+    config.backlog = options.backlog
+    config.graceful_timeout = options.graceful_timeout
+    config.accesslog = options.access_log
+    config.errorlog = '-'
+    print(CMDStyle.green + f'Serving on {", ".join(config.bind)} with {config.workers} {config.worker_class} workers' +
+          CMDStyle.reset)
+    run(config)
+
+
 def execute_from_command_line(argv):
     try:
         command = argv[1]
@@ -867,7 +932,10 @@ def execute_from_command_line(argv):
     commands_map = {
         'prepare_migration_folders': migration.prepare_migration_folders,
         'make_migrations': migration.make_migrations,
-        'migrate': migration.migrate
+        'migrate': migration.migrate,
+        'build_static_manifest': build_static_manifest,
+        'compress_static': compress_static,
+        'serve': serve,
     }
 
     try:
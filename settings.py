@@ -1,18 +1,48 @@
 import os
 
-from chgk.database import CommonDatabase
+from chgk.database_registry import DatabaseRegistry
 
 
 DATABASES_INFO = {
     'common': {
         'name': os.getenv('CHGK_SITE_DB_NAME', ''),
         'user': os.getenv('DB_USER'),
-        'password': os.getenv('DB_PASSWORD', '')
+        'password': os.getenv('DB_PASSWORD', ''),
+        'result_cache': {
+            'maxsize': int(os.getenv('DB_RESULT_CACHE_SIZE', 1024)),
+            'ttl': float(os.getenv('DB_RESULT_CACHE_TTL', 30)),
+        } if os.getenv('DB_RESULT_CACHE', '') == '1' else None,
+        'pool': {
+            'host': os.getenv('DB_HOST', 'localhost'),
+            'port': int(os.getenv('DB_PORT', 3306)),
+            'unix_socket': os.getenv('DB_SOCKET'),
+            'minsize': int(os.getenv('DB_POOL_MINSIZE', 1)),
+            'maxsize': int(os.getenv('DB_POOL_MAXSIZE', 10)),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 3600)),
+            'warmup': int(os.getenv('DB_POOL_WARMUP', 0)),
+        },
+        'replicas': [{'host': host, 'port': int(port or 3306)}
+                     for host, _, port in (replica.strip().partition(':')
+                                           for replica in os.getenv('DB_REPLICAS', '').split(',') if replica.strip())],
+        'replica_routing': os.getenv('DB_REPLICA_ROUTING', 'round_robin'),
+        'read_your_writes_window': float(os.getenv('DB_READ_YOUR_WRITES_WINDOW', 1)),
+        'single_flight': os.getenv('DB_SINGLE_FLIGHT', '1') == '1',
+        'backend': os.getenv('DB_BACKEND', 'mysql'),
+        'schema_ttl': float(os.getenv('DB_SCHEMA_TTL', 60)),
+        'instrumentation': {
+            'slow_query_threshold': float(os.getenv('DB_SLOW_QUERY_THRESHOLD', 0.5)),
+            'explain_slow_queries': os.getenv('DB_EXPLAIN_SLOW_QUERIES', '') == '1',
+            'capture_slow_query_params': os.getenv('DB_CAPTURE_SLOW_QUERY_PARAMS', '') == '1',
+        },
     },
     'default': 'common',
 }
 MIGRATIONS_TABLE_INFO = DATABASES_INFO['common']
+TEMPLATE_BYTECODE_CACHE_DIR = os.getenv('TEMPLATE_BYTECODE_CACHE_DIR')
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 30))
+LIVE_UPDATES_QUEUE_SIZE = int(os.getenv('LIVE_UPDATES_QUEUE_SIZE', 16))
+LIVE_UPDATES_BROKER_DIR = os.getenv('LIVE_UPDATES_BROKER_DIR')
+LIVE_STREAM_MAX_AGE = float(os.getenv('LIVE_STREAM_MAX_AGE', 25))
 
-db = CommonDatabase(DATABASES_INFO['common']['name'],
-                    user=DATABASES_INFO['common']['user'],
-                    password=DATABASES_INFO['common']['password'])
+databases = DatabaseRegistry.from_settings(DATABASES_INFO)
+db = databases.get()